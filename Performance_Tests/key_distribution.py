@@ -0,0 +1,128 @@
+"""
+Created on Apr 18, 2018
+
+@author: nhan.nguyen
+
+This module contains class "KeyDistribution" that chooses the targets of
+"GET" requests with a configurable key popularity (uniform, Zipf or hot-set)
+and a ratio of negative lookups of keys that are not on ledger.
+"""
+
+import bisect
+import itertools
+import json
+import os
+import random
+import utils
+
+
+class KeyDistribution:
+    distributions = ['uniform', 'zipf', 'hot']
+    base58_characters = \
+        '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+    def __init__(self, keys: list, distribution='uniform', zipf_exponent=1.0,
+                 hot_set=20, hot_ratio=80, negative_ratio=0):
+        """
+        :param keys: request info of the targets. The first key is the most
+                     popular one with "zipf" distribution.
+        :param distribution: "uniform", "zipf" or "hot".
+        :param zipf_exponent: exponent of "zipf" distribution. The key of
+                              rank k is chosen with weight 1 / k ** exponent.
+        :param hot_set: percentage of keys that are hot with "hot"
+                        distribution.
+        :param hot_ratio: percentage of choices that hit the hot keys with
+                          "hot" distribution.
+        :param negative_ratio: percentage of choices that are keys which do
+                               not exist on ledger.
+        """
+        self.keys = keys
+        self.distribution = distribution
+        self.hot_ratio = hot_ratio / 100
+        self.negative_ratio = negative_ratio / 100
+        self.hot_count = max(int(len(keys) * hot_set / 100), 1)
+        self.cumulative_weights = None
+        if distribution == 'zipf' and keys:
+            self.cumulative_weights = list(itertools.accumulate(
+                1 / rank ** zipf_exponent
+                for rank in range(1, len(keys) + 1)))
+
+    def choose(self):
+        """
+        Choose the request info of one target.
+
+        :return: (request info, the key exists on ledger or not).
+                 Request info is None if there is no key.
+        """
+        if not self.keys:
+            return None, True
+
+        if self.negative_ratio and random.random() < self.negative_ratio:
+            return KeyDistribution.make_missing_key(
+                random.choice(self.keys)), False
+
+        if self.distribution == 'zipf':
+            index = bisect.bisect_left(
+                self.cumulative_weights,
+                random.random() * self.cumulative_weights[-1])
+            return self.keys[min(index, len(self.keys) - 1)], True
+
+        if self.distribution == 'hot':
+            if random.random() < self.hot_ratio or \
+                    self.hot_count >= len(self.keys):
+                return self.keys[random.randrange(self.hot_count)], True
+            return self.keys[random.randrange(self.hot_count,
+                                              len(self.keys))], True
+
+        return random.choice(self.keys), True
+
+    def sample(self, number: int, counters=None):
+        """
+        Return a generator of the request info of "number" targets.
+
+        :param counters: (optional) dictionary that the number of negative
+                         lookups is counted into ("negative_req").
+        """
+        for _ in range(number):
+            key, exists = self.choose()
+            if key is None:
+                return
+            if not exists and counters is not None:
+                counters['negative_req'] = counters.get('negative_req', 0) + 1
+            yield key
+
+    @staticmethod
+    def make_missing_key(info):
+        """
+        Make the request info of a target that does not exist on ledger
+        from the request info of an existing one.
+
+        :param info: request info (dictionary or JSON string).
+        :return: request info (dictionary).
+        """
+        if isinstance(info, str):
+            info = json.loads(info)
+        data = dict(info['data'])
+        kind = info['kind']
+        if kind in ['nym', 'attribute']:
+            data['target_did'] = KeyDistribution.make_random_did()
+        elif kind == 'schema':
+            data['name'] = utils.generate_random_string(prefix='missing')
+        elif kind == 'claim':
+            data['issuer_did'] = KeyDistribution.make_random_did()
+
+        return {'kind': kind, 'data': data}
+
+    @staticmethod
+    def make_random_did() -> str:
+        """
+        Make a random DID (base58 of 16 random bytes) that has not been
+        written to ledger.
+        """
+        number = int.from_bytes(os.urandom(16), 'big')
+        did = ''
+        while number:
+            number, remainder = divmod(number, 58)
+            did = KeyDistribution.base58_characters[remainder] + did
+
+        return did
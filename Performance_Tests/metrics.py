@@ -0,0 +1,329 @@
+"""
+Created on Mar 26, 2018
+
+@author: nhan.nguyen
+
+This module contains class "LatencyHistogram" that records request latencies,
+class "MetricsShard" that keeps the metrics of one worker and some functions
+to merge and report them.
+"""
+
+import csv
+import json
+import time
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed (HDR style) histogram of latencies.
+    Latencies are recorded in microseconds. Each power of two is divided
+    into 64 linear sub-buckets so the relative error of a reported value is
+    less than 1%. Histograms can be merged by adding their bucket counts.
+    """
+    sub_bucket_bits = 7
+    sub_bucket_count = 1 << sub_bucket_bits
+    sub_bucket_half_count = sub_bucket_count >> 1
+    percentiles = [50, 90, 99, 99.9]
+
+    def __init__(self):
+        self.counts = dict()
+        self.count = 0
+        self.total = 0
+        self.min = self.max = -1
+
+    def record(self, seconds: float):
+        """
+        Record one latency.
+
+        :param seconds: latency in seconds.
+        """
+        value = max(int(seconds * 1000000), 0)
+        index = LatencyHistogram.index_of(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min < 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Add all latencies of other histogram into this histogram.
+        """
+        for index, count in list(other.counts.items()):
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min >= 0 and (self.min < 0 or other.min < self.min):
+            self.min = other.min
+        if other.max > self.max:
+            self.max = other.max
+
+    def percentile(self, percent: float) -> float:
+        """
+        Return the latency in seconds that "percent" percent of recorded
+        latencies are less than or equal to.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(int(round(percent / 100 * self.count)), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                value = LatencyHistogram.value_of(index)
+                return min(max(value, self.min), self.max) / 1000000
+        return self.max / 1000000
+
+    def mean(self) -> float:
+        """
+        Return the mean latency in seconds.
+        """
+        if self.count == 0:
+            return 0
+        return self.total / self.count / 1000000
+
+    def summary(self) -> dict:
+        """
+        Return count, mean, percentiles and max of the latencies (seconds).
+        """
+        result = {'count': self.count, 'mean': self.mean()}
+        for percent in LatencyHistogram.percentiles:
+            result['p{}'.format(percent)] = self.percentile(percent)
+        result['max'] = max(self.max, 0) / 1000000
+        return result
+
+    def to_dict(self) -> dict:
+        """
+        Return the histogram as a JSON serializable dictionary.
+        """
+        return {'counts': {str(index): count
+                           for index, count in self.counts.items()},
+                'count': self.count, 'total': self.total,
+                'min': self.min, 'max': self.max}
+
+    @staticmethod
+    def from_dict(data: dict):
+        """
+        Create the histogram from a dictionary returned by "to_dict".
+        """
+        histogram = LatencyHistogram()
+        histogram.counts = {int(index): count
+                            for index, count in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+    @staticmethod
+    def index_of(value: int) -> int:
+        """
+        Return the index of the bucket that contains value (microseconds).
+        """
+        if value < LatencyHistogram.sub_bucket_count:
+            return value
+        shift = value.bit_length() - LatencyHistogram.sub_bucket_bits
+        sub_bucket = (value >> shift) - LatencyHistogram.sub_bucket_half_count
+        return LatencyHistogram.sub_bucket_count + \
+            (shift - 1) * LatencyHistogram.sub_bucket_half_count + sub_bucket
+
+    @staticmethod
+    def value_of(index: int) -> int:
+        """
+        Return the middle value (microseconds) of the bucket at index.
+        """
+        if index < LatencyHistogram.sub_bucket_count:
+            return index
+        index -= LatencyHistogram.sub_bucket_count
+        shift = index // LatencyHistogram.sub_bucket_half_count + 1
+        sub_bucket = index % LatencyHistogram.sub_bucket_half_count + \
+            LatencyHistogram.sub_bucket_half_count
+        return (sub_bucket << shift) + (1 << (shift - 1))
+
+
+class MetricsShard:
+    """
+    Counters and latency histograms of one worker.
+    A shard is only updated by the thread that owns it, so it needs no lock.
+    Shards are merged when a report or a snapshot is made.
+    """
+
+    def __init__(self):
+        self.passed_req = self.failed_req = 0
+        self.start_time = self.finish_time = 0
+        self.latencies = dict()
+        self.series = dict()
+        self.counters = dict()
+
+    def record(self, kind, status, elapsed_time, count_request=True):
+        """
+        Record the result of one request.
+        The latency is also recorded into the time series bucket of the
+        wall-clock second that the request completed in.
+
+        :param kind: kind of request.
+        :param status: "passed" or the class of failure
+                       (timeout, rejected, nack, client_error).
+        :param elapsed_time: latency of the request in seconds.
+        :param count_request: count the request as passed or failed or
+                              only record its latency.
+        """
+        if count_request and status == 'passed':
+            self.passed_req += 1
+        elif count_request:
+            self.failed_req += 1
+        key = '{}/{}'.format(kind, status)
+
+        histogram = self.latencies.get(key)
+        if histogram is None:
+            histogram = self.latencies[key] = LatencyHistogram()
+        histogram.record(elapsed_time)
+
+        second = int(time.time())
+        bucket = self.series.get(second)
+        if bucket is None:
+            bucket = self.series[second] = dict()
+        histogram = bucket.get(key)
+        if histogram is None:
+            histogram = bucket[key] = LatencyHistogram()
+        histogram.record(elapsed_time)
+
+    def count(self, name, value=1):
+        """
+        Add value to a named counter (retries, cache hits...).
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def update_start_and_finish_time(self, start_time, finish_time):
+        """
+        Extend the time range of the shard.
+        """
+        if start_time and (not self.start_time
+                           or start_time < self.start_time):
+            self.start_time = start_time
+        if finish_time > self.finish_time:
+            self.finish_time = finish_time
+
+    def merge(self, other):
+        """
+        Add all metrics of other shard into this shard.
+        """
+        self.passed_req += other.passed_req
+        self.failed_req += other.failed_req
+        self.update_start_and_finish_time(other.start_time,
+                                          other.finish_time)
+        self.latencies = merge_latencies([self.latencies, other.latencies])
+        self.series = merge_series([self.series, other.series])
+        for name, value in list(other.counters.items()):
+            self.count(name, value)
+
+
+def merge_latencies(lst_latencies: list) -> dict:
+    """
+    Merge several dictionaries of histograms.
+
+    :param lst_latencies: list of dictionaries that map a key
+                          ("kind/status") to a LatencyHistogram.
+    :return: merged dictionary.
+    """
+    result = dict()
+    for latencies in lst_latencies:
+        for key, histogram in list(latencies.items()):
+            if key not in result:
+                result[key] = LatencyHistogram()
+            result[key].merge(histogram)
+    return result
+
+
+def latencies_to_dict(latencies: dict) -> dict:
+    """
+    Convert a dictionary of histograms to a JSON serializable dictionary.
+    """
+    return {key: histogram.to_dict() for key, histogram in latencies.items()}
+
+
+def latencies_from_dict(data: dict) -> dict:
+    """
+    Convert a dictionary returned by "latencies_to_dict" back to histograms.
+    """
+    return {key: LatencyHistogram.from_dict(histogram)
+            for key, histogram in data.items()}
+
+
+def merge_series(lst_series: list) -> dict:
+    """
+    Merge several time series.
+
+    :param lst_series: list of dictionaries that map a wall-clock second to
+                       a dictionary of histograms ("kind/status").
+    :return: merged time series.
+    """
+    result = dict()
+    for series in lst_series:
+        for second, latencies in list(series.items()):
+            result[second] = merge_latencies([result.get(second, dict()),
+                                              latencies])
+    return result
+
+
+def series_to_dict(series: dict) -> dict:
+    """
+    Convert a time series to a JSON serializable dictionary.
+    """
+    return {str(second): latencies_to_dict(latencies)
+            for second, latencies in series.items()}
+
+
+def series_from_dict(data: dict) -> dict:
+    """
+    Convert a dictionary returned by "series_to_dict" back to time series.
+    """
+    return {int(second): latencies_from_dict(latencies)
+            for second, latencies in data.items()}
+
+
+def series_rows(series: dict) -> list:
+    """
+    Flatten a time series into rows of second, kind, status, count, mean,
+    percentiles and max.
+    """
+    rows = list()
+    for second in sorted(series):
+        for key in sorted(series[second]):
+            kind, _, status = key.rpartition('/')
+            row = {'second': second, 'kind': kind, 'status': status}
+            row.update(series[second][key].summary())
+            rows.append(row)
+    return rows
+
+
+def write_series(series: dict, csv_path: str, jsonl_path: str):
+    """
+    Write a time series as CSV and JSON lines files.
+    """
+    rows = series_rows(series)
+    fields = ['second', 'kind', 'status', 'count', 'mean'] + \
+        ['p{}'.format(percent) for percent in LatencyHistogram.percentiles] + \
+        ['max']
+
+    with open(csv_path, 'w', newline='') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with open(jsonl_path, 'w') as jsonl_file:
+        for row in rows:
+            print(json.dumps(row), file=jsonl_file)
+
+
+def format_latency_summary(name: str, histogram: LatencyHistogram) -> str:
+    """
+    Return one line that reports count, mean, percentiles and max.
+    """
+    summary = histogram.summary()
+    values = ', '.join('{}: {:.6f}'.format(key, summary[key])
+                       for key in summary if key != 'count')
+    return '{} ({} txns) - {} second(s)'.format(name, summary['count'],
+                                                values)
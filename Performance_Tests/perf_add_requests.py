@@ -8,12 +8,18 @@ submit several "ADD" requests testing.
 """
 
 import os
+import sys
 import time
 import argparse
+import asyncio
+import shutil
+import sqlite3
+import multiprocessing
 import utils
-import threading
 import requests_builder
 import requests_sender
+import request_corpus
+import request_info_store
 import perf_tester
 
 
@@ -64,6 +70,139 @@ class Option:
                                  'The default value will be 1', action='store',
                             type=int, default=1, dest='thread_num')
 
+        parser.add_argument('--inflight',
+                            help='Specify the number of requests that each '
+                                 'thread keeps outstanding at once. '
+                                 'The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='inflight')
+
+        parser.add_argument('--engine',
+                            help='How the workers are run. "thread" creates '
+                                 'one thread per worker, "loop" runs all '
+                                 'workers as coroutines on event loops. '
+                                 'The default value will be "thread"',
+                            action='store', choices=['thread', 'loop'],
+                            default='thread', dest='engine')
+
+        parser.add_argument('--loops',
+                            help='Number of event loops used by "loop" '
+                                 'engine. Use 0 to create one loop per CPU '
+                                 'core. The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='loops')
+
+        parser.add_argument('--build-concurrency',
+                            help='Specify the number of requests that are '
+                                 'built at once. '
+                                 'The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='build_concurrency')
+
+        parser.add_argument('--persist',
+                            help='Write the built requests to temporary '
+                                 'files instead of keeping them in memory '
+                                 'until they are sent',
+                            action='store_true', default=False,
+                            dest='persist')
+
+        parser.add_argument('--corpus-format',
+                            help='Format of the requests written by '
+                                 '"--persist". "text" writes one JSON request '
+                                 'per line, "binary" writes one indexed '
+                                 'binary corpus that is read through mmap. '
+                                 'The default value will be "text"',
+                            action='store', choices=['text', 'binary'],
+                            default='text', dest='corpus_format')
+
+        parser.add_argument('--payload',
+                            help='Payload profile of the requests '
+                                 '(number of schema attributes, claim key '
+                                 'size and attribute value size). '
+                                 'The default value will be "default"',
+                            action='store',
+                            choices=sorted(requests_builder.RequestBuilder.
+                                           payload_profiles),
+                            default='default', dest='payload')
+
+        parser.add_argument('--did-pool',
+                            help='Create the DIDs of "nym", "attribute" '
+                                 'and "claim" requests in bulk before '
+                                 'building the requests',
+                            action='store_true', default=False,
+                            dest='did_pool')
+
+        parser.add_argument('--did-seed',
+                            help='Create the DIDs of "--did-pool" from seeds '
+                                 'made from this prefix so that they can be '
+                                 're-derived. By default, DIDs are random',
+                            action='store', default=None, dest='did_seed')
+
+        parser.add_argument('--onboard',
+                            help='Before building "attribute" or "claim" '
+                                 'requests, create their DIDs in bulk and '
+                                 'write the NYMs of them concurrently. The '
+                                 'number and time of these NYM requests '
+                                 'are reported',
+                            action='store_true', default=False,
+                            dest='onboard')
+
+        parser.add_argument('--corpus-cache',
+                            help='Reuse the binary corpus built by a '
+                                 'previous run with the same kind, number '
+                                 'of requests, seed, payload profile, DID '
+                                 'options, SDK version and genesis '
+                                 'file. A corpus that is not found is built '
+                                 'in this process and cached. Reused '
+                                 'requests get new request ids. It cannot '
+                                 'be used with "--presign" or with '
+                                 '"attribute" and "claim" requests because '
+                                 'the NYMs of their DIDs are not on a fresh '
+                                 'pool',
+                            action='store_true', default=False,
+                            dest='corpus_cache')
+
+        parser.add_argument('--pipeline',
+                            help='Send the requests while they are being '
+                                 'built instead of building all of them '
+                                 'first. Requests are passed through a '
+                                 'bounded queue in memory',
+                            action='store_true', default=False,
+                            dest='pipeline')
+
+        parser.add_argument('--queue-size',
+                            help='Specify the maximum number of built '
+                                 'requests that wait to be sent in '
+                                 '"--pipeline" mode. '
+                                 'The default value will be 1000',
+                            action='store', type=int, default=1000,
+                            dest='queue_size')
+
+        parser.add_argument('--build-procs',
+                            help='Specify the number of processes that build '
+                                 'the requests. Each process uses its own '
+                                 'wallet. "attribute" and "claim" requests '
+                                 'are always signed while building when '
+                                 'more than one process is used. '
+                                 'The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='build_procs')
+
+        parser.add_argument('--presign',
+                            help='Sign the requests while building them. '
+                                 'The signed requests are only submitted, '
+                                 'so signing is not measured as part of the '
+                                 'latency of the ledger',
+                            action='store_true', default=False,
+                            dest='presign')
+
+        parser.add_argument('--info-store',
+                            help='Specify a SQLite request info store that '
+                                 'the info of the sent requests are also '
+                                 'added to (see "perf_get_requests.py '
+                                 '--info-store")',
+                            action='store', default=None, dest='info_store')
+
         parser.add_argument('--log',
                             help='To see all log. If this flag does not exist,'
                                  'program just only print fail message',
@@ -77,7 +216,13 @@ class PerformanceTesterForAddingRequest(perf_tester.Tester):
                                              "request_info"),
                  request_num=100, request_kind='nym',
                  seed='000000000000000000000000Trustee1', thread_num=1,
-                 log=False):
+                 log=False, inflight=1,
+                 engine='thread', loops=1, req_timeout=0, retries=0,
+                 backoff=0.5, presign=False, build_concurrency=1,
+                 build_procs=1, pipeline=False, queue_size=1000,
+                 persist=False, corpus_format='text', corpus_cache=False,
+                 did_pool=False, did_seed=None, did_offset=0, onboard=False,
+                 payload='default', info_store=None):
         super().__init__(log, seed)
 
         self.info_dir = info_dir
@@ -89,9 +234,38 @@ class PerformanceTesterForAddingRequest(perf_tester.Tester):
             self.thread_num = request_num
         else:
             self.thread_num = thread_num
+        self.inflight = inflight
+        self.engine = engine
+        self.loops = loops
+        self.req_timeout = req_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.presign = presign
+        self.build_concurrency = build_concurrency
+        self.build_procs = build_procs
+        self.pipeline = pipeline
+        self.queue_size = queue_size
+        self.persist = persist
+        self.corpus_format = corpus_format
+        self.corpus_cache = corpus_cache
+        if corpus_cache:
+            error = PerformanceTesterForAddingRequest.check_corpus_cache(
+                request_kind, presign)
+            if error:
+                utils.force_print_error_to_console(error)
+                sys.exit(1)
+        self.did_pool = did_pool
+        self.did_seed = did_seed
+        # Clients that share "did_seed" take seeds from ranges that start
+        # at different offsets, so their DIDs do not collide.
+        self.did_offset = did_offset
+        self.onboard = onboard
+        self.payload = payload
+        self.info_store = info_store
 
-        self.info_file_path = "{}_{}_{}.txt".format(
-            self.req_kind + "_requests_info", str(threading.get_ident()),
+        self.info_file_path = "{}_{}_{}_{}.txt".format(
+            self.req_kind + "_requests_info", str(os.getpid()),
+            utils.generate_random_string(size=8),
             time.strftime("%d-%m-%Y_%H-%M-%S"))
 
         self.info_file_path = os.path.join(self.info_dir,
@@ -112,28 +286,367 @@ class PerformanceTesterForAddingRequest(perf_tester.Tester):
 
         args = {'wallet_handle': self.wallet_handle,
                 'pool_handle': self.pool_handle,
-                'submitter_did': self.submitter_did}
+                'submitter_did': self.submitter_did,
+                'payload': self.payload}
+
+        if self.pipeline:
+            await self.generate_dids(args)
+            await self.build_and_send_in_pipeline(args)
+            self.add_requests_info_to_store()
+            return
 
         # 5. Build requests and save them in to files.
-        builder = requests_builder.RequestBuilder(self.info_file_path,
-                                                  self.log)
+        if self.corpus_cache and not request_corpus.get_sdk_version():
+            utils.force_print_warning_to_console(
+                'Cannot find the version of python3-indy. '
+                'Build the requests without corpus cache...\n')
+            self.corpus_cache = False
+
+        if self.corpus_cache:
+            req_files = await self.load_or_build_cached_corpus(args)
+        elif self.build_procs > 1:
+            req_files = await asyncio.get_event_loop().run_in_executor(
+                None, self.build_in_processes)
+        else:
+            await self.generate_dids(args)
+            builder = requests_builder.RequestBuilder(self.info_file_path,
+                                                      self.log,
+                                                      self.build_concurrency,
+                                                      self.corpus_format)
 
-        req_files = await builder.build_several_adding_req_to_files(
-            args, self.req_kind, self.thread_num, self.req_num)
+            req_files = await builder.build_several_adding_req_to_files(
+                args, self.req_kind, self.thread_num, self.req_num,
+                self.presign, self.persist)
 
         # 6. Sign and submit several request into ledger.
-        sender = requests_sender.RequestsSender(self.log)
+        sender = requests_sender.RequestsSender(self.log, self.inflight,
+                                                self.engine, self.loops,
+                                                self.req_timeout, self.retries,
+                                                self.backoff)
         try:
             await sender.sign_and_submit_several_reqs_from_files(
                 args, req_files, self.req_kind)
         except Exception:
             pass
-        self.passed_req, self.failed_req = sender.passed_req, sender.failed_req
+        result = sender.snapshot()
+        self.passed_req, self.failed_req = result.passed_req, result.failed_req
+
+        self.start_time, self.finish_time = (result.start_time,
+                                             result.finish_time)
+        self.latencies = result.latencies
+        self.series = result.series
+        self.counters.update(result.counters)
+        self.add_requests_info_to_store()
+
+    def add_requests_info_to_store(self):
+        """
+        Add the request info of the sent requests to the request info
+        store if "info_store" is given. They are all written at the finish
+        time of this tester.
+        """
+        if not self.info_store or not os.path.exists(self.info_file_path):
+            return
+
+        try:
+            store = request_info_store.RequestInfoStore(self.info_store)
+            try:
+                added = store.add_from_file(self.info_file_path,
+                                            self.finish_time or None)
+            finally:
+                store.close()
+        except sqlite3.Error as e:
+            utils.force_print_warning_to_console(
+                'Cannot add request info to {}: {}. Skip...\n'.format(
+                    self.info_store, str(e)))
+            return
+        utils.print_ok_blue('Added {} request info to {}\n'.format(
+            added, self.info_store))
+
+    @staticmethod
+    def check_corpus_cache(req_kind, presign):
+        """
+        Check that the requests of kind can be reused from the corpus
+        cache.
+
+        :return: error message or None if they can be reused.
+        """
+        if req_kind in ['attribute', 'claim']:
+            # Replayed requests are sent by DIDs whose NYMs were written
+            # when the corpus was built, so a fresh pool rejects them.
+            return '"--corpus-cache" cannot be used with "attribute" and ' \
+                   '"claim" requests because the NYMs of their DIDs are ' \
+                   'not on a fresh pool\n'
+        if presign:
+            # The request id of a signed request cannot be renewed, so the
+            # pool would answer a replayed request with its stored reply.
+            return '"--corpus-cache" cannot be used with "--presign" ' \
+                   'because signed requests are replayed with the same ' \
+                   'request ids\n'
+        return None
+
+    async def generate_dids(self, args):
+        """
+        Create the DIDs that the requests need in bulk and put them into
+        args as "did_pool" if "--did-pool" or "--onboard" is used.
+
+        :param args: arguments to build requests.
+        """
+        if not self.did_pool and not self.onboard:
+            return
+
+        if not self.log:
+            utils.start_capture_console()
+        self.counters.update(await prepare_dids(
+            args, self.req_kind, self.req_num, self.build_concurrency,
+            self.did_seed, self.did_offset, self.onboard))
+        utils.stop_capture_console()
+
+    async def load_or_build_cached_corpus(self, args):
+        """
+        Take the requests from the corpus cache or build them into a
+        binary corpus and put it into the cache. The request info of the
+        corpus is copied to the request info file.
+
+        :return: list of "thread_num" slices of the corpus.
+        """
+        cache = request_corpus.CorpusCache(
+            os.path.join(os.path.dirname(__file__), 'corpus_cache'))
+        key = request_corpus.CorpusCache.make_key(
+            self.req_kind, self.req_num, self.seed, self.presign,
+            self.config.pool_genesis_file,
+            {'payload': self.payload, 'did_pool': self.did_pool,
+             'did_seed': self.did_seed, 'did_offset': self.did_offset,
+             'onboard': self.onboard})
+
+        cached = cache.get(key)
+        if cached:
+            utils.print_ok_blue('Reuse cached corpus ' + cached[0])
+            shutil.copyfile(cached[1], self.info_file_path)
+        else:
+            await self.generate_dids(args)
+            builder = requests_builder.RequestBuilder(self.info_file_path,
+                                                      self.log,
+                                                      self.build_concurrency,
+                                                      'binary')
+            slices = await builder.build_several_adding_req_to_files(
+                args, self.req_kind, 1, self.req_num, self.presign, True)
+            slices[0].corpus.close()
+            cached = cache.put(key, slices[0].corpus.path,
+                               self.info_file_path)
+
+        return request_corpus.Corpus(cached[0],
+                                     new_req_ids=True).slices(self.thread_num)
+
+    async def build_and_send_in_pipeline(self, args):
+        """
+        Build requests and send them at the same time. Builders put the
+        requests into a bounded queue that "thread_num" sender workers
+        drain, so sending starts with the first built request and the
+        corpus is never stored as a whole.
+        """
+        builder = requests_builder.RequestBuilder(self.info_file_path,
+                                                  self.log,
+                                                  self.build_concurrency)
+        sender = requests_sender.RequestsSender(self.log, self.inflight,
+                                                self.engine, self.loops,
+                                                self.req_timeout, self.retries,
+                                                self.backoff)
+        queue = asyncio.Queue(maxsize=max(self.queue_size, 1))
+
+        if not self.log:
+            utils.start_capture_console()
+        try:
+            await asyncio.gather(
+                builder.build_several_adding_req_to_queue(
+                    args, self.req_kind, self.req_num, queue, self.presign),
+                sender.sign_and_submit_reqs_from_queue(
+                    args, queue, self.req_kind, self.thread_num))
+        except Exception as e:
+            utils.force_print_error_to_console(str(e) + "\n")
+        utils.stop_capture_console()
+
+        result = sender.snapshot()
+        self.passed_req, self.failed_req = result.passed_req, result.failed_req
+
+        self.start_time, self.finish_time = (result.start_time,
+                                             result.finish_time)
+        self.latencies = result.latencies
+        self.series = result.series
+        self.counters.update(result.counters)
+
+    def build_in_processes(self):
+        """
+        Divide the requests among "build_procs" processes and build them
+        concurrently. Each process writes its own request files and part of
+        the request info file. The j-th request files of all processes are
+        joined so that the sender still gets "thread_num" files.
+
+        :return: list of request files.
+        """
+        works = requests_builder.RequestBuilder.divide(
+            min(self.build_procs, self.req_num), self.req_num)
+        # "attribute" and "claim" requests are sent by DIDs that only exist
+        # in the wallet of the process that builds them.
+        presign = self.presign or self.req_kind in ['attribute', 'claim']
+
+        # Processes are spawned instead of forked because this process
+        # already has the pool and wallet of libindy (and its threads) open.
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        processes = dict()
+        info_parts = list()
+        for shard, work in enumerate(works):
+            info_part = '{}.part{}'.format(self.info_file_path, shard)
+            did_offset = self.did_offset + sum(works[:shard])
+            info_parts.append(info_part)
+            process = context.Process(
+                target=build_in_process,
+                kwargs={'queue': queue,
+                        'shard': shard,
+                        'info_file_path': info_part,
+                        'request_num': work,
+                        'request_kind': self.req_kind,
+                        'seed': self.seed,
+                        'file_num': self.thread_num,
+                        'log': self.log,
+                        'presign': presign,
+                        'build_concurrency': self.build_concurrency,
+                        'did_pool': self.did_pool,
+                        'did_seed': self.did_seed,
+                        'onboard': self.onboard,
+                        'payload': self.payload,
+                        'did_offset': did_offset})
+            process.start()
+            processes[shard] = process
+
+        lst_files = list()
+        for shard, result in utils.take_process_results(queue, processes):
+            if result is None:
+                utils.force_print_error_to_console(
+                    'Build process {} exited with code {} without '
+                    'result\n'.format(shard, processes[shard].exitcode))
+                self.counters['failed_shard'] = \
+                    self.counters.get('failed_shard', 0) + 1
+                continue
+            files, counters = result
+            lst_files.append(files)
+            for name, value in counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+        for process in processes.values():
+            process.join()
+
+        with open(self.info_file_path, 'w') as info_file:
+            for info_part in info_parts:
+                if not os.path.exists(info_part):
+                    continue
+                with open(info_part, 'r') as part:
+                    shutil.copyfileobj(part, info_file)
+                os.remove(info_part)
+
+        req_files = list()
+        for i in range(self.thread_num):
+            parts = [files[i] for files in lst_files if i < len(files)]
+            if not parts:
+                continue
+            with open(parts[0], 'a') as req_file:
+                for part_name in parts[1:]:
+                    with open(part_name, 'r') as part:
+                        shutil.copyfileobj(part, req_file)
+                    os.remove(part_name)
+            req_files.append(parts[0])
+
+        return req_files
+
+
+class BuilderOfAddingRequest(perf_tester.Tester):
+    """
+    Build one shard of "ADD" requests with its own pool and wallet.
+    It is run in a worker process when "--build-procs" is used.
+    """
+    def __init__(self, info_file_path, request_num=100, request_kind='nym',
+                 seed='000000000000000000000000Trustee1', file_num=1,
+                 log=False, presign=False, build_concurrency=1,
+                 did_pool=False, did_seed=None, did_offset=0,
+                 onboard=False, payload='default'):
+        super().__init__(log, seed)
+
+        self.info_file_path = info_file_path
+        self.req_num = request_num
+        self.req_kind = request_kind
+        self.file_num = file_num
+        self.presign = presign
+        self.build_concurrency = build_concurrency
+        self.did_pool = did_pool
+        self.did_seed = did_seed
+        self.did_offset = did_offset
+        self.onboard = onboard
+        self.payload = payload
+        self.req_files = list()
+
+    async def _test(self):
+        """
+        Override from "Tester" class to build the requests of the shard.
+        """
+        args = {'wallet_handle': self.wallet_handle,
+                'pool_handle': self.pool_handle,
+                'submitter_did': self.submitter_did,
+                'payload': self.payload}
+
+        if self.did_pool or self.onboard:
+            self.counters.update(await prepare_dids(
+                args, self.req_kind, self.req_num, self.build_concurrency,
+                self.did_seed, self.did_offset, self.onboard))
+
+        builder = requests_builder.RequestBuilder(self.info_file_path,
+                                                  self.log,
+                                                  self.build_concurrency)
+        self.req_files = await builder.build_several_adding_req_to_files(
+            args, self.req_kind, self.file_num, self.req_num, self.presign)
+
+
+def build_in_process(queue, shard, **kwargs):
+    """
+    Process function that builds one shard with "BuilderOfAddingRequest"
+    and puts (shard, (list of its request files, its counters)) into queue.
+    """
+    builder = BuilderOfAddingRequest(**kwargs)
+    try:
+        utils.run_async_method(None, builder.test)
+    finally:
+        queue.put((shard, (builder.req_files, builder.counters)))
+
+
+async def prepare_dids(args, req_kind, number_of_did, concurrency=1,
+                       did_seed=None, did_offset=0, onboard=False) -> dict:
+    """
+    Create the DIDs of the requests in bulk into "did_pool" of args.
+    If "onboard" is True, the NYMs of the DIDs that "attribute" and "claim"
+    requests need are written to ledger before building the requests.
+
+    :param args: arguments to build requests.
+    :param req_kind: kind of ADD request.
+    :param number_of_did: number of DIDs.
+    :param concurrency: number of DIDs (or NYMs) that are created
+                        (or sent) at once.
+    :param did_seed: (optional) prefix of the seeds of DIDs.
+    :param did_offset: index of the first seed.
+    :param onboard: send the NYMs of the DIDs in bulk or not.
+    :return: counters of the auxiliary NYM requests.
+    """
+    if req_kind == 'schema':
+        return dict()
+
+    did_pool = requests_builder.DidPool()
+    await did_pool.generate(args['wallet_handle'], number_of_did, concurrency,
+                            did_seed, did_offset)
+    args['did_pool'] = did_pool
+
+    if not onboard or req_kind == 'nym':
+        return dict()
 
-        self.start_time, self.finish_time = (sender.start_time,
-                                             sender.finish_time)
-        self.fastest_txn = sender.fastest_txn
-        self.lowest_txn = sender.lowest_txn
+    sent, failed, elapsed_time = await did_pool.onboard(args, concurrency)
+    return {'aux_req': sent, 'aux_failed_req': failed,
+            'aux_time': elapsed_time}
 
 
 if __name__ == '__main__':
@@ -141,7 +654,13 @@ if __name__ == '__main__':
     opts = options.args
     tester = PerformanceTesterForAddingRequest(
         opts.info_dir, opts.number_of_requests, opts.kind, opts.seed,
-        opts.thread_num, opts.log)
+        opts.thread_num, opts.log, opts.inflight, opts.engine, opts.loops,
+        presign=opts.presign, build_concurrency=opts.build_concurrency,
+        build_procs=opts.build_procs, pipeline=opts.pipeline,
+        queue_size=opts.queue_size, persist=opts.persist,
+        corpus_format=opts.corpus_format, corpus_cache=opts.corpus_cache,
+        did_pool=opts.did_pool, did_seed=opts.did_seed, onboard=opts.onboard,
+        payload=opts.payload, info_store=opts.info_store)
 
     utils.run_async_method(None, tester.test)
 
@@ -0,0 +1,194 @@
+"""
+Created on Mar 19, 2018
+
+@author: nhan.nguyen
+
+This module contains classes "Coordinator" and "Agent" that distribute the
+load generation across several machines.
+The coordinator hands out one shard of work to each agent over a plain TCP
+socket, the agents run the testers of their shard and send the results back.
+Messages are JSON objects, one per line.
+"""
+
+import argparse
+import json
+import socket
+import time
+import utils
+
+
+def parse_address(address: str):
+    """
+    Parse an address in format "host:port".
+
+    :return: (host, port).
+    """
+    host, _, port = address.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def send_message(stream, message: dict):
+    """
+    Write one message to a socket stream.
+    """
+    stream.write(json.dumps(message) + '\n')
+    stream.flush()
+
+
+def receive_message(stream) -> dict:
+    """
+    Read one message from a socket stream.
+
+    :return: the message or None if the connection is closed.
+    """
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class Coordinator:
+    def __init__(self, address: str, number_of_agents: int,
+                 start_delay: int = 5, timeout: int = 3600):
+        """
+        :param address: "host:port" that the coordinator listens on.
+        :param number_of_agents: number of agents to wait for.
+        :param start_delay: seconds between handing out the last shard and
+                            the moment that all agents start testing.
+        :param timeout: seconds to wait for all agents to connect and,
+                        after they start testing, for all their results.
+                        The shard of an agent that does not connect or
+                        answer in time is counted as failed.
+        """
+        self.address = parse_address(address)
+        self.number_of_agents = number_of_agents
+        self.start_delay = start_delay
+        self.timeout = timeout
+
+    def run(self, lst_options: list):
+        """
+        Hand out the shards to the agents and wait for their results.
+
+        :param lst_options: options of each shard,
+                            one shard will be sent to one agent.
+        :return: (list of tester results (as dictionaries) of all agents,
+                 number of shards that have no result).
+        """
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.address)
+        server.listen(len(lst_options))
+
+        connections = list()
+        utils.force_print_warning_to_console(
+            'Waiting for {} agent(s) on {}:{}...'.format(
+                len(lst_options), *self.address))
+        results = list()
+        failed_shards = 0
+        try:
+            deadline = time.time() + self.timeout
+            while len(connections) < len(lst_options):
+                server.settimeout(max(deadline - time.time(), 0.001))
+                try:
+                    conn, address = server.accept()
+                except socket.timeout:
+                    failed_shards += len(lst_options) - len(connections)
+                    utils.force_print_error_to_console(
+                        'Only {} of {} agent(s) connected in time\n'.format(
+                            len(connections), len(lst_options)))
+                    break
+                utils.force_print_green_to_console(
+                    'Agent {}:{} connected'.format(*address))
+                connections.append((conn, conn.makefile('rw')))
+
+            start_at = time.time() + self.start_delay
+            for shard, (options, (_, stream)) in enumerate(
+                    zip(lst_options, connections)):
+                send_message(stream, {'shard': shard,
+                                      'options': vars(options),
+                                      'start_at': start_at})
+
+            deadline = start_at + self.timeout
+            for conn, stream in connections:
+                conn.settimeout(max(deadline - time.time(), 0.001))
+                try:
+                    message = receive_message(stream)
+                except (OSError, ValueError) as e:
+                    utils.force_print_error_to_console(
+                        'Cannot receive the result of an agent: {}\n'.format(
+                            str(e) or 'timed out'))
+                    failed_shards += 1
+                    continue
+                if message is None:
+                    utils.force_print_error_to_console(
+                        'An agent closed the connection without result\n')
+                    failed_shards += 1
+                    continue
+                results.extend(message['results'])
+        finally:
+            for conn, stream in connections:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+                conn.close()
+            server.close()
+
+        return results, failed_shards
+
+
+class Agent:
+    def __init__(self, address: str, run_shard, connect_timeout: int = 60):
+        """
+        :param address: "host:port" of the coordinator.
+        :param run_shard: function that runs the testers of a shard.
+                          It takes (options, shard) and returns list of
+                          tester results as dictionaries.
+        :param connect_timeout: seconds to keep retrying to connect.
+        """
+        self.address = parse_address(address)
+        self.run_shard = run_shard
+        self.connect_timeout = connect_timeout
+
+    def run(self):
+        """
+        Wait for a shard from the coordinator, run it and send back
+        the result.
+        """
+        conn = self.__connect()
+        stream = conn.makefile('rw')
+        try:
+            work = receive_message(stream)
+            if work is None:
+                utils.force_print_error_to_console(
+                    'Coordinator closed the connection without work')
+                return
+
+            utils.force_print_green_to_console(
+                'Received shard {} from coordinator'.format(work['shard']))
+            delay = work['start_at'] - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            options = argparse.Namespace(**work['options'])
+            results = self.run_shard(options, work['shard'])
+            send_message(stream, {'shard': work['shard'],
+                                  'results': results})
+        finally:
+            stream.close()
+            conn.close()
+
+    def __connect(self):
+        """
+        Connect to the coordinator, retry until it is listening.
+
+        :return: connected socket.
+        """
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                return socket.create_connection(self.address)
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(1)
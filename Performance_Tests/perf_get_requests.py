@@ -11,10 +11,13 @@ import os
 import sys
 import glob
 import utils
+import asyncio
 import argparse
 import perf_tester
+import key_distribution
 import requests_builder
 import requests_sender
+import request_info_store
 
 
 class Options:
@@ -45,6 +48,191 @@ class Options:
                                  'The default value will be 1', action='store',
                             type=int, default=1, dest='thread_num')
 
+        parser.add_argument('--inflight',
+                            help='Specify the number of requests that each '
+                                 'thread keeps outstanding at once. '
+                                 'The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='inflight')
+
+        parser.add_argument('--engine',
+                            help='How the workers are run. "thread" creates '
+                                 'one thread per worker, "loop" runs all '
+                                 'workers as coroutines on event loops. '
+                                 'The default value will be "thread"',
+                            action='store', choices=['thread', 'loop'],
+                            default='thread', dest='engine')
+
+        parser.add_argument('--loops',
+                            help='Number of event loops used by "loop" '
+                                 'engine. Use 0 to create one loop per CPU '
+                                 'core. The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='loops')
+
+        parser.add_argument('--build-concurrency',
+                            help='Specify the number of requests that are '
+                                 'built at once. '
+                                 'The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='build_concurrency')
+
+        parser.add_argument('--pipeline',
+                            help='Read request info lazily and send the '
+                                 'requests while they are being built '
+                                 'instead of building all of them first. '
+                                 'Requests are passed through a bounded '
+                                 'queue in memory',
+                            action='store_true', default=False,
+                            dest='pipeline')
+
+        parser.add_argument('--queue-size',
+                            help='Specify the maximum number of built '
+                                 'requests that wait to be sent in '
+                                 '"--pipeline" mode. '
+                                 'The default value will be 1000',
+                            action='store', type=int, default=1000,
+                            dest='queue_size')
+
+        parser.add_argument('--persist',
+                            help='Write the built requests to temporary '
+                                 'files instead of keeping them in memory '
+                                 'until they are sent',
+                            action='store_true', default=False,
+                            dest='persist')
+
+        parser.add_argument('--corpus-format',
+                            help='Format of the requests written by '
+                                 '"--persist". "text" writes one JSON request '
+                                 'per line, "binary" writes one indexed '
+                                 'binary corpus that is read through mmap. '
+                                 'The default value will be "text"',
+                            action='store', choices=['text', 'binary'],
+                            default='text', dest='corpus_format')
+
+        parser.add_argument('--info-store',
+                            help='Specify a SQLite request info store '
+                                 '(see "perf_add_requests.py --info-store") '
+                                 'to sample the targets from instead of the '
+                                 'request info files of "-d"',
+                            action='store', default=None, dest='info_store')
+
+        parser.add_argument('--sample',
+                            help='How the targets are sampled from '
+                                 '"--info-store". "all" takes all of them, '
+                                 '"random" takes random ones, "recent" takes '
+                                 'the most recently written ones and "range" '
+                                 'takes the ones written between "--since" '
+                                 'and "--until". Request info is written at '
+                                 'the time that the client which sent it '
+                                 'finished. The default value will be '
+                                 '"all"',
+                            action='store',
+                            choices=['all', 'random', 'recent', 'range'],
+                            default='all', dest='sample')
+
+        parser.add_argument('--sample-size',
+                            help='Specify the number of sampled targets. '
+                                 'Use 0 to sample as many targets as the '
+                                 'store has. The default value will be 0',
+                            action='store', type=int, default=0,
+                            dest='sample_size')
+
+        parser.add_argument('--since',
+                            help='Start time (seconds since epoch) of '
+                                 '"--sample range"',
+                            action='store', type=float, default=None,
+                            dest='since')
+
+        parser.add_argument('--until',
+                            help='End time (seconds since epoch) of '
+                                 '"--sample range"',
+                            action='store', type=float, default=None,
+                            dest='until')
+
+        parser.add_argument('--distribution',
+                            help='Popularity of the targets. "once" sends '
+                                 'one request to each target, "uniform", '
+                                 '"zipf" and "hot" choose the targets of '
+                                 '"-n" requests randomly with that '
+                                 'distribution. The default value will be '
+                                 '"once"',
+                            action='store',
+                            choices=['once'] +
+                            key_distribution.KeyDistribution.distributions,
+                            default='once', dest='distribution')
+
+        parser.add_argument('-n',
+                            help='Specify the number of requests that are '
+                                 'sent with "--distribution". Use 0 to send '
+                                 'as many requests as targets. '
+                                 'The default value will be 0',
+                            action='store', type=int, default=0,
+                            dest='request_num')
+
+        parser.add_argument('--zipf-exponent',
+                            help='Exponent of "--distribution zipf". '
+                                 'The default value will be 1.0',
+                            action='store', type=float, default=1.0,
+                            dest='zipf_exponent')
+
+        parser.add_argument('--hot-set',
+                            help='Percentage of targets that are hot with '
+                                 '"--distribution hot". '
+                                 'The default value will be 20',
+                            action='store', type=float, default=20,
+                            dest='hot_set')
+
+        parser.add_argument('--hot-ratio',
+                            help='Percentage of requests that go to the hot '
+                                 'targets with "--distribution hot". '
+                                 'The default value will be 80',
+                            action='store', type=float, default=80,
+                            dest='hot_ratio')
+
+        parser.add_argument('--negative-ratio',
+                            help='Percentage of requests whose targets do '
+                                 'not exist on ledger. It is used with '
+                                 '"--distribution" other than "once". '
+                                 'The default value will be 0',
+                            action='store', type=float, default=0,
+                            dest='negative_ratio')
+
+        parser.add_argument('--cache-size',
+                            help='Specify the maximum number of responses '
+                                 'of a client-side cache in front of "GET" '
+                                 'requests (least recently used responses '
+                                 'are evicted). Use 0 to disable the cache. '
+                                 'The default value will be 0',
+                            action='store', type=int, default=0,
+                            dest='cache_size')
+
+        parser.add_argument('--cache-ttl',
+                            help='Specify the seconds that a cached '
+                                 'response stays valid. Use 0 to keep '
+                                 'responses until they are evicted. '
+                                 'The default value will be 0',
+                            action='store', type=float, default=0,
+                            dest='cache_ttl')
+
+        parser.add_argument('--hedge-delay',
+                            help='Specify the seconds after which a '
+                                 'duplicate of a "GET" request that has not '
+                                 'been answered is sent. The first answer '
+                                 'is used. Use 0 to disable hedging. '
+                                 'The default value will be 0',
+                            action='store', type=float, default=0,
+                            dest='hedge_delay')
+
+        parser.add_argument('--hedge-percentile',
+                            help='Use this percentile (e.g. 95) of the '
+                                 'observed latency of "GET" requests as the '
+                                 'delay of hedging. "--hedge-delay" is used '
+                                 'until enough latencies are observed. '
+                                 'The default value will be 0 (not used)',
+                            action='store', type=float, default=0,
+                            dest='hedge_percentile')
+
         parser.add_argument('--log',
                             help='To see all log. If this flag does not exist,'
                                  'program just only print fail message',
@@ -56,7 +244,15 @@ class Options:
 class PerformanceTesterGetSentRequestFromLedger(perf_tester.Tester):
     def __init__(self, info_dir=os.path.join(os.path.dirname(__file__),
                                              "request_info"),
-                 kind='nym', thread_num=1, log=False):
+                 kind='nym', thread_num=1, log=False, inflight=1,
+                 engine='thread', loops=1, req_timeout=0, retries=0,
+                 backoff=0.5, persist=False, corpus_format='text',
+                 build_concurrency=1, pipeline=False, queue_size=1000,
+                 info_store=None, sample='all', sample_size=0, since=None,
+                 until=None, distribution='once', request_num=0,
+                 zipf_exponent=1.0, hot_set=20, hot_ratio=80,
+                 negative_ratio=0, cache_size=0, cache_ttl=0, hedge_delay=0,
+                 hedge_percentile=0):
         super().__init__(log, '000000000000000000000000Trustee1')
         if thread_num <= 0:
             self.thread_num = 1
@@ -64,6 +260,32 @@ class PerformanceTesterGetSentRequestFromLedger(perf_tester.Tester):
             self.thread_num = thread_num
         self.info_dir = info_dir
         self.req_kind = kind
+        self.inflight = inflight
+        self.engine = engine
+        self.loops = loops
+        self.req_timeout = req_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.persist = persist
+        self.corpus_format = corpus_format
+        self.build_concurrency = build_concurrency
+        self.pipeline = pipeline
+        self.queue_size = queue_size
+        self.info_store = info_store
+        self.sample = sample
+        self.sample_size = sample_size
+        self.since = since
+        self.until = until
+        self.distribution = distribution
+        self.request_num = request_num
+        self.zipf_exponent = zipf_exponent
+        self.hot_set = hot_set
+        self.hot_ratio = hot_ratio
+        self.negative_ratio = negative_ratio
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
         self.pool_handle = self.wallet_handle = 0
 
         self.threads = list()
@@ -75,7 +297,28 @@ class PerformanceTesterGetSentRequestFromLedger(perf_tester.Tester):
         Override from "Tester" class to implement testing steps.
         """
 
-        info_files = self.__collect_requests_info_files()
+        store = None
+        if self.info_store:
+            store = request_info_store.RequestInfoStore(self.info_store)
+            if not store.count(self.req_kind):
+                utils.force_print_error_to_console(
+                    'Cannot found any request info in store. '
+                    'Skip sending get request... Abort')
+                sys.exit(1)
+            requests_info = store.sample(self.req_kind, self.sample,
+                                         self.sample_size, self.since,
+                                         self.until)
+        else:
+            requests_info = requests_builder.RequestBuilder.read_requests_info(
+                self.__collect_requests_info_files())
+
+        if self.distribution != 'once':
+            keys = list(requests_info)
+            distribution = key_distribution.KeyDistribution(
+                keys, self.distribution, self.zipf_exponent, self.hot_set,
+                self.hot_ratio, self.negative_ratio)
+            requests_info = distribution.sample(
+                self.request_num or len(keys), self.counters)
 
         # 1. Create ledger config from genesis txn file
         # 2. Open pool
@@ -86,24 +329,53 @@ class PerformanceTesterGetSentRequestFromLedger(perf_tester.Tester):
                 'pool_handle': self.pool_handle,
                 'wallet_handle': self.wallet_handle}
 
-        # 5. Build getting request from info from files.
-        builder = requests_builder.RequestBuilder(None, self.log)
-        req_files = await builder.build_several_getting_req_to_files(
-            args, self.req_kind, self.thread_num, info_files)
-
-        # 6. Submit getting request to ledger.
-        sender = requests_sender.RequestsSender(self.log)
-        try:
-            await sender.submit_several_reqs_from_files(args, req_files,
-                                                        self.req_kind)
-        except Exception:
-            pass
-
-        self.passed_req, self.failed_req = sender.passed_req, sender.failed_req
-        self.start_time, self.finish_time = (sender.start_time,
-                                             sender.finish_time)
-        self.fastest_txn = sender.fastest_txn
-        self.lowest_txn = sender.lowest_txn
+        builder = requests_builder.RequestBuilder(
+            None, self.log, self.build_concurrency, self.corpus_format)
+        sender = requests_sender.RequestsSender(self.log, self.inflight,
+                                                self.engine, self.loops,
+                                                self.req_timeout, self.retries,
+                                                self.backoff, self.cache_size,
+                                                self.cache_ttl,
+                                                self.hedge_delay,
+                                                self.hedge_percentile)
+
+        if self.pipeline:
+            # 5. Build getting requests and submit them at the same time.
+            queue = asyncio.Queue(maxsize=max(self.queue_size, 1))
+            if not self.log:
+                utils.start_capture_console()
+            try:
+                await asyncio.gather(
+                    builder.build_several_getting_req_to_queue(
+                        args, self.req_kind, requests_info, queue),
+                    sender.submit_reqs_from_queue(
+                        args, queue, self.req_kind, self.thread_num))
+            except Exception as e:
+                utils.force_print_error_to_console(str(e) + "\n")
+            utils.stop_capture_console()
+        else:
+            # 5. Build getting request from info from files.
+            req_files = await builder.build_several_getting_req_to_files(
+                args, self.req_kind, self.thread_num, requests_info,
+                self.persist)
+
+            # 6. Submit getting request to ledger.
+            try:
+                await sender.submit_several_reqs_from_files(args, req_files,
+                                                            self.req_kind)
+            except Exception:
+                pass
+
+        if store:
+            store.close()
+
+        result = sender.snapshot()
+        self.passed_req, self.failed_req = result.passed_req, result.failed_req
+        self.start_time, self.finish_time = (result.start_time,
+                                             result.finish_time)
+        self.latencies = result.latencies
+        self.series = result.series
+        self.counters.update(result.counters)
 
     def __collect_requests_info_files(self):
         """
@@ -126,10 +398,19 @@ class PerformanceTesterGetSentRequestFromLedger(perf_tester.Tester):
 if __name__ == '__main__':
     options = Options()
     opts = options.args
-    tester = PerformanceTesterGetSentRequestFromLedger(opts.info_dir,
-                                                       opts.kind,
-                                                       opts.thread_num,
-                                                       opts.log)
+    tester = PerformanceTesterGetSentRequestFromLedger(
+        opts.info_dir, opts.kind, opts.thread_num, opts.log, opts.inflight,
+        opts.engine, opts.loops, persist=opts.persist,
+        corpus_format=opts.corpus_format,
+        build_concurrency=opts.build_concurrency, pipeline=opts.pipeline,
+        queue_size=opts.queue_size, info_store=opts.info_store,
+        sample=opts.sample, sample_size=opts.sample_size, since=opts.since,
+        until=opts.until, distribution=opts.distribution,
+        request_num=opts.request_num, zipf_exponent=opts.zipf_exponent,
+        hot_set=opts.hot_set, hot_ratio=opts.hot_ratio,
+        negative_ratio=opts.negative_ratio, cache_size=opts.cache_size,
+        cache_ttl=opts.cache_ttl, hedge_delay=opts.hedge_delay,
+        hedge_percentile=opts.hedge_percentile)
 
     # Start the method
     elapsed_time = utils.run_async_method(None, tester.test)
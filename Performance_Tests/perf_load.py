@@ -14,6 +14,7 @@ import argparse
 import random
 import requests_builder
 import requests_sender
+import worker_engine
 
 from perf_tester import Tester
 
@@ -40,6 +41,21 @@ class Option:
                             action='store', type=int,
                             default=100, dest='transactions_num')
 
+        parser.add_argument('--engine',
+                            help='How the workers are run. "thread" creates '
+                                 'one thread per worker, "loop" runs all '
+                                 'workers as coroutines on event loops. '
+                                 'The default value will be "thread"',
+                            action='store', choices=['thread', 'loop'],
+                            default='thread', dest='engine')
+
+        parser.add_argument('--loops',
+                            help='Number of event loops used by "loop" '
+                                 'engine. Use 0 to create one loop per CPU '
+                                 'core. The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='loops')
+
         parser.add_argument('--log',
                             help='To see all log. If this flag does not exist,'
                                  'program just only print fail message',
@@ -51,6 +67,32 @@ class Option:
                             action='store', type=int,
                             default=100, dest='time_out')
 
+        parser.add_argument('--rate',
+                            help='Send requests at this constant rate '
+                                 '(transactions per second) without waiting '
+                                 'for responses. Latency is measured from '
+                                 'the intended send time. By default, each '
+                                 'client waits for a response before '
+                                 'sending the next request.',
+                            action='store', type=float, default=0,
+                            dest='rate')
+
+        parser.add_argument('--payload',
+                            help='Payload profile of the requests '
+                                 '(number of schema attributes, claim key '
+                                 'size and attribute value size). '
+                                 'The default value will be "default"',
+                            action='store',
+                            choices=sorted(requests_builder.RequestBuilder.
+                                           payload_profiles),
+                            default='default', dest='payload')
+
+        parser.add_argument('--arrival',
+                            help='Timeline of send times when "--rate" is '
+                                 'used. The default value will be "fixed"',
+                            action='store', choices=['fixed', 'poisson'],
+                            default='fixed', dest='arrival')
+
         self.args = parser.parse_args()
 
 
@@ -60,36 +102,54 @@ class TesterSimulateLoad(Tester):
     def __init__(self, number_of_clients: int=2,
                  number_of_transactions: int=1000,
                  time_out: int=300, log=False,
-                 seed="000000000000000000000000Trustee1"):
+                 seed="000000000000000000000000Trustee1",
+                 engine='thread', loops=1, rate=0, arrival='fixed',
+                 req_timeout=0, retries=0, backoff=0.5, payload='default'):
         super().__init__(log=log, seed=seed)
 
+        self.engine = engine
+        self.loops = loops
+        self.rate = rate
+        self.arrival = arrival
+        self.payload = payload
         self.time_out = time_out
         self.number_of_clients = number_of_clients
         self.number_of_transactions = number_of_transactions
         self.__current_time = time.time()
         self.__current_total_txn = 0
         self.__lock = threading.Lock()
-        self.__sender = requests_sender.RequestsSender()
+        self.__sender = requests_sender.RequestsSender(
+            timeout=req_timeout, retries=retries, backoff=backoff)
 
     async def _test(self):
         """
         Override from "Tester" class to implement testing steps.
         """
-        lst_threads = list()
         self.__current_time = time.time()
-        for _ in range(self.number_of_clients):
-            thread = threading.Thread(target=self.__simulate_client)
-            thread.setDaemon(True)
-            thread.start()
-            lst_threads.append(thread)
-
-        for thread in lst_threads:
-            thread.join(self.time_out * 1.1)
-
-        self.passed_req = self.__sender.passed_req
-        self.failed_req = self.__sender.failed_req
-        self.fastest_txn = self.__sender.fastest_txn
-        self.lowest_txn = self.__sender.lowest_txn
+        if self.rate > 0:
+            await self.__simulate_open_loop()
+        elif self.engine == 'loop':
+            workers = [self.__simulate_client_in_loop] * \
+                self.number_of_clients
+            await worker_engine.WorkerEngine(self.loops).run(
+                workers, self.time_out * 1.1)
+        else:
+            lst_threads = list()
+            for _ in range(self.number_of_clients):
+                thread = threading.Thread(target=self.__simulate_client)
+                thread.setDaemon(True)
+                thread.start()
+                lst_threads.append(thread)
+
+            for thread in lst_threads:
+                thread.join(self.time_out * 1.1)
+
+        result = self.__sender.snapshot()
+        self.passed_req = result.passed_req
+        self.failed_req = result.failed_req
+        self.latencies = result.latencies
+        self.series = result.series
+        self.counters = result.counters
 
     def __update(self):
         """
@@ -113,20 +173,101 @@ class TesterSimulateLoad(Tester):
         Simulate the client to perform the test.
         """
         loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        utils.run_async_method(loop, self.__simulate_client_in_loop)
+        loop.close()
+
+    async def __simulate_client_in_loop(self):
+        """
+        Simulate the client in the current event loop.
+        """
         args = {"wallet_handle": self.wallet_handle,
                 "pool_handle": self.pool_handle,
-                "submitter_did": self.submitter_did}
+                "submitter_did": self.submitter_did,
+                "payload": self.payload}
 
-        asyncio.set_event_loop(loop)
         while time.time() - self.__current_time < self.time_out:
             if self.__update():
                 break
 
-            self.finish_time = utils.run_async_method(
-                loop, TesterSimulateLoad._build_and_send_request,
-                self.__sender, args)
+            response_time = \
+                await TesterSimulateLoad._build_and_send_request(
+                    self.__sender, args)
+            if response_time:
+                self.finish_time = response_time
 
-        loop.close()
+    async def __simulate_open_loop(self):
+        """
+        Send requests at a constant arrival rate no matter how fast the
+        ledger responds. The send times follow a fixed or Poisson timeline
+        and latency is measured from the intended send time, so a slow
+        ledger makes latency grow instead of reducing the offered load.
+        Clients build requests ahead of the timeline into a bounded queue.
+        Requests that are not answered before time out are cancelled and
+        recorded as "timeout" with their latency from the intended send time.
+        """
+        args = {"wallet_handle": self.wallet_handle,
+                "pool_handle": self.pool_handle,
+                "submitter_did": self.submitter_did,
+                "payload": self.payload}
+        queue = asyncio.Queue(maxsize=max(self.number_of_clients * 2,
+                                          int(self.rate)))
+        builders = [asyncio.ensure_future(self.__build_requests(args, queue))
+                    for _ in range(self.number_of_clients)]
+
+        tasks = list()
+        intended_time = self.start_time = time.time()
+        for _ in range(self.number_of_transactions):
+            if intended_time - self.__current_time >= self.time_out:
+                break
+            delay = intended_time - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            kind, req = await queue.get()
+            tasks.append((asyncio.ensure_future(self.__sender.send_request(
+                args, kind, req, intended_time)), kind, intended_time))
+
+            if self.arrival == 'poisson':
+                intended_time += random.expovariate(self.rate)
+            else:
+                intended_time += 1 / self.rate
+
+        for builder in builders:
+            builder.cancel()
+        await asyncio.wait(builders)
+
+        time_left = self.__current_time + self.time_out * 1.1 - time.time()
+        if tasks:
+            done, pending = await asyncio.wait([task[0] for task in tasks],
+                                               timeout=max(time_left, 0))
+            shard = self.__sender.get_shard()
+            now = time.time()
+            for task, kind, intended_time in tasks:
+                if task in pending:
+                    task.cancel()
+                    shard.record(kind, 'timeout', now - intended_time)
+            if pending:
+                await asyncio.wait(pending)
+            self.finish_time = max([task.result() for task in done
+                                    if not task.exception() and
+                                    task.result()] or [time.time()])
+
+    async def __build_requests(self, args, queue):
+        """
+        Keep building requests of random kinds into queue.
+        """
+        while True:
+            kind = TesterSimulateLoad._random_req_kind()
+            try:
+                req = await requests_builder.RequestBuilder.build_request(
+                    args, kind)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                utils.force_print_error_to_console(str(e) + "\n")
+                continue
+            await queue.put((kind, req))
 
     @staticmethod
     def _random_req_kind():
@@ -160,7 +301,10 @@ if __name__ == '__main__':
     tester = TesterSimulateLoad(time_out=opts.time_out,
                                 number_of_clients=opts.clients,
                                 log=opts.log,
-                                number_of_transactions=opts.transactions_num)
+                                number_of_transactions=opts.transactions_num,
+                                engine=opts.engine, loops=opts.loops,
+                                rate=opts.rate, arrival=opts.arrival,
+                                payload=opts.payload)
 
     utils.run_async_method(None, tester.test)
 
@@ -0,0 +1,247 @@
+"""
+Created on Apr 2, 2018
+
+@author: nhan.nguyen
+
+This module contains class "StepLoadRamp" that increases the offered load
+step by step to find the saturation point of the pool.
+"""
+
+import argparse
+import sys
+import utils
+import metrics
+import perf_load
+
+
+class Option:
+    def __init__(self):
+        parser = argparse.ArgumentParser(
+            description='Script to find the saturation point of the pool. '
+                        'The offered load is increased in steps, each step '
+                        'is a load test of a fixed dwell time. The ramp '
+                        'stops when throughput plateaus or error rate or '
+                        'p99 latency crosses a threshold.\n\n',
+
+            usage='To increase the rate from 10 to 100 txns/s in steps of '
+                  '10 txns/s, 30 seconds per step'
+                  '\nuse: python3.6 perf_ramp.py --ramp rate --start 10 '
+                  '--step 10 --steps 10 --dwell 30')
+
+        parser.add_argument('--ramp',
+                            help='What is increased in each step. '
+                                 '"clients" is the number of closed-loop '
+                                 'clients, "rate" is the constant arrival '
+                                 'rate (txns/s). '
+                                 'The default value will be "rate"',
+                            action='store', choices=['clients', 'rate'],
+                            default='rate', dest='ramp')
+
+        parser.add_argument('--start',
+                            help='Load of the first step. '
+                                 'The default value will be 10',
+                            action='store', type=float, default=10,
+                            dest='start')
+
+        parser.add_argument('--step',
+                            help='Load added in each step. '
+                                 'The default value will be 10',
+                            action='store', type=float, default=10,
+                            dest='step')
+
+        parser.add_argument('--steps',
+                            help='Maximum number of steps. '
+                                 'The default value will be 10',
+                            action='store', type=int, default=10,
+                            dest='steps')
+
+        parser.add_argument('--dwell',
+                            help='Duration of each step in seconds. '
+                                 'The default value will be 30',
+                            action='store', type=int, default=30,
+                            dest='dwell')
+
+        parser.add_argument('-c',
+                            help='Number of clients that build requests '
+                                 'when ramping by "rate". '
+                                 'The default value will be 4',
+                            action='store', type=int, default=4,
+                            dest='clients')
+
+        parser.add_argument('--max-p99',
+                            help='Stop when p99 latency (seconds) of a step '
+                                 'is greater than this value. '
+                                 'The default value will be 0 (no limit)',
+                            action='store', type=float, default=0,
+                            dest='max_p99')
+
+        parser.add_argument('--max-error-rate',
+                            help='Stop when the ratio of failed requests of '
+                                 'a step is greater than this value. '
+                                 'The default value will be 0.05',
+                            action='store', type=float, default=0.05,
+                            dest='max_error_rate')
+
+        parser.add_argument('--plateau',
+                            help='Stop when throughput of a step grows less '
+                                 'than this ratio over the best previous '
+                                 'step. The default value will be 0.05',
+                            action='store', type=float, default=0.05,
+                            dest='plateau')
+
+        parser.add_argument('--log',
+                            help='To see all log. If this flag does not exist,'
+                                 'program just only print fail message',
+                            action='store_true', default=False, dest='log')
+
+        self.args = parser.parse_args()
+
+
+class StepLoadRamp:
+    def __init__(self, ramp='rate', start=10, step=10, steps=10, dwell=30,
+                 number_of_clients=4, max_p99=0, max_error_rate=0.05,
+                 plateau=0.05, log=False, **tester_kwargs):
+        """
+        :param ramp: "clients" or "rate".
+        :param start: load of the first step.
+        :param step: load added in each step.
+        :param steps: maximum number of steps.
+        :param dwell: duration of each step in seconds.
+        :param number_of_clients: number of clients that build requests
+                                  when ramping by "rate".
+        :param max_p99: p99 latency limit in seconds (0 means no limit).
+        :param max_error_rate: limit of the ratio of failed requests.
+        :param plateau: minimum throughput growth to keep ramping.
+        :param tester_kwargs: other arguments of
+                              perf_load.TesterSimulateLoad.
+        """
+        self.ramp = ramp
+        self.start = start
+        self.step = step
+        self.steps = steps
+        self.dwell = dwell
+        self.number_of_clients = number_of_clients
+        self.max_p99 = max_p99
+        self.max_error_rate = max_error_rate
+        self.plateau = plateau
+        self.log = log
+        self.tester_kwargs = tester_kwargs
+
+        self.results = list()
+        self.knee = None
+        self.stop_reason = ''
+
+    def run(self):
+        """
+        Run the steps until a stop condition is met.
+
+        :return: list of results of steps.
+        """
+        best_tps = 0
+        for i in range(self.steps):
+            load = self.start + i * self.step
+            if self.ramp == 'clients':
+                load = int(load)
+            result = self.run_step(load)
+            self.results.append(result)
+            utils.force_print_warning_to_console(
+                'Step {}: {} {} => {:.1f} txns/s, p99 {:.3f}s, '
+                'error rate {:.3f}'.format(i + 1, self.ramp, load,
+                                           result['tps'], result['p99'],
+                                           result['error_rate']))
+
+            if result['error_rate'] > self.max_error_rate:
+                self.stop_reason = 'error rate crossed {}'.format(
+                    self.max_error_rate)
+                break
+            if 0 < self.max_p99 < result['p99']:
+                self.stop_reason = 'p99 latency crossed {}s'.format(
+                    self.max_p99)
+                break
+            if best_tps and result['tps'] < best_tps * (1 + self.plateau):
+                self.stop_reason = 'throughput plateaued'
+                if result['tps'] > best_tps:
+                    self.knee = result
+                break
+
+            best_tps = result['tps']
+            self.knee = result
+        else:
+            # The pool never saturated, so the last step is not a knee.
+            self.stop_reason = 'all steps passed'
+            self.knee = None
+
+        return self.results
+
+    def run_step(self, load) -> dict:
+        """
+        Run a load test at one step of load.
+
+        :param load: number of clients or rate of the step.
+        :return: load, throughput, p99 latency and error rate of the step.
+        """
+        if self.ramp == 'clients':
+            tester = perf_load.TesterSimulateLoad(
+                load, sys.maxsize, self.dwell, self.log,
+                **self.tester_kwargs)
+        else:
+            tester = perf_load.TesterSimulateLoad(
+                self.number_of_clients, int(load * self.dwell) + 1,
+                self.dwell, self.log, rate=load, **self.tester_kwargs)
+
+        utils.run_async_method(None, tester.test)
+
+        total = tester.passed_req + tester.failed_req
+        elapsed_time = tester.get_elapsed_time()
+        passed = metrics.merge_latencies(
+            [{'passed': histogram}
+             for key, histogram in tester.latencies.items()
+             if key.endswith('/passed')]).get('passed',
+                                              metrics.LatencyHistogram())
+
+        return {'load': load,
+                'tps': tester.passed_req / elapsed_time
+                if elapsed_time > 0 else 0,
+                'p99': passed.percentile(99),
+                'error_rate': tester.failed_req / total if total else 0,
+                'passed': tester.passed_req,
+                'failed': tester.failed_req}
+
+    def write_result(self, result_file):
+        """
+        Write the result of every step and the knee point.
+
+        :param result_file: the file that result will be written.
+        """
+        print("\n -----------  Step-load ramp by {}  -----------".format(
+            self.ramp), file=result_file)
+        for result in self.results:
+            print("\n {}: {} => {:.1f} txns/s, p99: {:.6f} second(s), "
+                  "passed: {}, failed: {}, error rate: {:.3f}".format(
+                      self.ramp, result['load'], result['tps'],
+                      result['p99'], result['passed'], result['failed'],
+                      result['error_rate']), file=result_file)
+
+        print("\n Stopped because: " + self.stop_reason, file=result_file)
+        if self.knee:
+            print("\n Knee point: {} {} => {:.1f} txns/s, p99: {:.6f} "
+                  "second(s)".format(self.ramp, self.knee['load'],
+                                     self.knee['tps'], self.knee['p99']),
+                  file=result_file)
+        elif self.results and self.stop_reason == 'all steps passed':
+            print("\n Knee point: not found within the tested range "
+                  "(up to {} {}). Increase \"--steps\" or \"--step\" to "
+                  "find it.".format(self.ramp, self.results[-1]['load']),
+                  file=result_file)
+        else:
+            print("\n Knee point: not found", file=result_file)
+
+
+if __name__ == '__main__':
+    opts = Option().args
+
+    ramp = StepLoadRamp(opts.ramp, opts.start, opts.step, opts.steps,
+                        opts.dwell, opts.clients, opts.max_p99,
+                        opts.max_error_rate, opts.plateau, opts.log)
+    ramp.run()
+    ramp.write_result(sys.stdout)
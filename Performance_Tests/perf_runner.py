@@ -14,11 +14,19 @@ import utils
 import threading
 import asyncio
 import sys
+import multiprocessing
+import perf_tester
+import metrics
+import key_distribution
+import requests_builder
 import perf_add_requests
 import perf_get_requests
 import perf_load
 import perf_traffic
+import perf_distributed
+import perf_ramp
 import requests_sender
+import worker_engine
 
 
 class Options:
@@ -74,7 +82,8 @@ class Options:
                             help='How many transactions you want to submit to '
                                  'ledger when starting adding requests.'
                                  'If you start getting request testing, '
-                                 'this arg will be ignore.'
+                                 'this arg will be ignore unless '
+                                 '"--distribution" is used.'
                                  'In case that you use flag "-t", this '
                                  'parameter will be the number of '
                                  'transactions of a set.'
@@ -88,6 +97,363 @@ class Options:
                             default=1, type=int, required=False,
                             dest='thread_num')
 
+        parser.add_argument('--inflight',
+                            help='Number of requests that each thread keeps '
+                                 'outstanding at once when sending "ADD" or '
+                                 '"GET" requests. Default value is 1',
+                            default=1, type=int, required=False,
+                            dest='inflight')
+
+        parser.add_argument('--build-concurrency',
+                            help='With "-a" or "-g", number of requests '
+                                 'that each client builds at once. '
+                                 'Default value is 1',
+                            default=1, type=int, required=False,
+                            dest='build_concurrency')
+
+        parser.add_argument('--persist',
+                            help='With "-a" or "-g", write the built '
+                                 'requests to temporary files instead of '
+                                 'keeping them in memory until they are sent',
+                            action='store_true', default=False,
+                            required=False, dest='persist')
+
+        parser.add_argument('--corpus-format',
+                            help='Format of the requests written by '
+                                 '"--persist". "text" writes one JSON request '
+                                 'per line, "binary" writes one indexed '
+                                 'binary corpus. Default value is "text"',
+                            action='store', choices=['text', 'binary'],
+                            default='text', required=False,
+                            dest='corpus_format')
+
+        parser.add_argument('--payload',
+                            help='With "-a" or "-l", payload profile of the '
+                                 'requests (number of schema attributes, '
+                                 'claim key size and attribute value size). '
+                                 'Default value is "default"',
+                            action='store',
+                            choices=sorted(requests_builder.RequestBuilder.
+                                           payload_profiles),
+                            default='default', required=False,
+                            dest='payload')
+
+        parser.add_argument('--payload-sweep',
+                            help='With "-a" or "-l", run the test once for '
+                                 'each payload profile of this comma '
+                                 'separated list (e.g. "default,small,large")'
+                                 ' and report throughput and latency of each',
+                            default=None, required=False,
+                            dest='payload_sweep')
+
+        parser.add_argument('--did-pool',
+                            help='With "-a", create the DIDs of the requests '
+                                 'in bulk before building the requests',
+                            action='store_true', default=False,
+                            required=False, dest='did_pool')
+
+        parser.add_argument('--did-seed',
+                            help='Create the DIDs of "--did-pool" from seeds '
+                                 'made from this prefix so that they can be '
+                                 're-derived',
+                            default=None, required=False, dest='did_seed')
+
+        parser.add_argument('--onboard',
+                            help='With "-a", write the NYMs of the DIDs of '
+                                 '"attribute" or "claim" requests '
+                                 'concurrently before building the requests',
+                            action='store_true', default=False,
+                            required=False, dest='onboard')
+
+        parser.add_argument('--corpus-cache',
+                            help='With "-a", reuse the binary corpus built '
+                                 'by a previous run with the same kind, '
+                                 'number of requests, seed, payload profile, '
+                                 'DID options, SDK version and genesis file, '
+                                 'or build and cache it ("nym" and "schema" '
+                                 'only, not with "--presign")',
+                            action='store_true', default=False,
+                            required=False, dest='corpus_cache')
+
+        parser.add_argument('--info-store',
+                            help='With "-a", also add the request info to '
+                                 'this SQLite store. With "-g", sample the '
+                                 'targets from this store instead of the '
+                                 'request info files',
+                            default=None, required=False, dest='info_store')
+
+        parser.add_argument('--sample',
+                            help='With "-g" and "--info-store", how the '
+                                 'targets are sampled: "all", "random", '
+                                 '"recent" (most recently written) or '
+                                 '"range" (written between "--since" and '
+                                 '"--until"). Request info is written at '
+                                 'the time that the client which sent it '
+                                 'finished. Default value is "all"',
+                            action='store',
+                            choices=['all', 'random', 'recent', 'range'],
+                            default='all', required=False, dest='sample')
+
+        parser.add_argument('--sample-size',
+                            help='Number of sampled targets. Default value '
+                                 'is 0 (as many as the store has)',
+                            default=0, type=int, required=False,
+                            dest='sample_size')
+
+        parser.add_argument('--since',
+                            help='Start time (seconds since epoch) of '
+                                 '"--sample range"',
+                            default=None, type=float, required=False,
+                            dest='since')
+
+        parser.add_argument('--until',
+                            help='End time (seconds since epoch) of '
+                                 '"--sample range"',
+                            default=None, type=float, required=False,
+                            dest='until')
+
+        parser.add_argument('--distribution',
+                            help='With "-g" or "-t", popularity of the '
+                                 'targets of "GET" requests. "once" (only '
+                                 'with "-g") sends one request to each '
+                                 'target, "uniform", "zipf" and "hot" choose '
+                                 'the targets randomly ("-n" requests with '
+                                 '"-g"). Default value is "once" with "-g" '
+                                 'and "uniform" with "-t"',
+                            action='store',
+                            choices=['once'] +
+                            key_distribution.KeyDistribution.distributions,
+                            default=None, required=False,
+                            dest='distribution')
+
+        parser.add_argument('--zipf-exponent',
+                            help='Exponent of "--distribution zipf". '
+                                 'Default value is 1.0',
+                            default=1.0, type=float, required=False,
+                            dest='zipf_exponent')
+
+        parser.add_argument('--hot-set',
+                            help='Percentage of targets that are hot with '
+                                 '"--distribution hot". Default value is 20',
+                            default=20, type=float, required=False,
+                            dest='hot_set')
+
+        parser.add_argument('--hot-ratio',
+                            help='Percentage of requests that go to the hot '
+                                 'targets with "--distribution hot". '
+                                 'Default value is 80',
+                            default=80, type=float, required=False,
+                            dest='hot_ratio')
+
+        parser.add_argument('--negative-ratio',
+                            help='Percentage of "GET" requests whose '
+                                 'targets do not exist on ledger. '
+                                 'Default value is 0',
+                            default=0, type=float, required=False,
+                            dest='negative_ratio')
+
+        parser.add_argument('--cache-size',
+                            help='With "-g" or "-t", maximum number of '
+                                 'responses of a client-side LRU cache in '
+                                 'front of "GET" requests. Default value is '
+                                 '0 (no cache)',
+                            default=0, type=int, required=False,
+                            dest='cache_size')
+
+        parser.add_argument('--cache-ttl',
+                            help='Seconds that a cached "GET" response stays '
+                                 'valid. Default value is 0 (until it is '
+                                 'evicted)',
+                            default=0, type=float, required=False,
+                            dest='cache_ttl')
+
+        parser.add_argument('--hedge-delay',
+                            help='With "-g" or "-t", seconds after which a '
+                                 'duplicate of a "GET" request that has not '
+                                 'been answered is sent. Default value is 0 '
+                                 '(no hedging)',
+                            default=0, type=float, required=False,
+                            dest='hedge_delay')
+
+        parser.add_argument('--hedge-percentile',
+                            help='With "-g" or "-t", use this percentile '
+                                 '(e.g. 95) of the observed "GET" latency as '
+                                 'the delay of hedging. Default value is 0 '
+                                 '(not used)',
+                            default=0, type=float, required=False,
+                            dest='hedge_percentile')
+
+        parser.add_argument('--pipeline',
+                            help='With "-a" or "-g", send the requests '
+                                 'while they are being built through a '
+                                 'bounded queue in memory',
+                            action='store_true', default=False,
+                            required=False, dest='pipeline')
+
+        parser.add_argument('--queue-size',
+                            help='Maximum number of built requests that '
+                                 'wait to be sent in "--pipeline" mode. '
+                                 'Default value is 1000',
+                            default=1000, type=int, required=False,
+                            dest='queue_size')
+
+        parser.add_argument('--build-procs',
+                            help='With "-a", number of processes that each '
+                                 'client uses to build its requests. '
+                                 'Default value is 1',
+                            default=1, type=int, required=False,
+                            dest='build_procs')
+
+        parser.add_argument('--presign',
+                            help='With "-a", sign the requests while '
+                                 'building them so that only submitting is '
+                                 'measured',
+                            action='store_true', default=False,
+                            required=False, dest='presign')
+
+        parser.add_argument('--engine',
+                            help='How clients and their workers are run. '
+                                 '"thread" creates one thread per worker, '
+                                 '"loop" runs all of them as coroutines on '
+                                 'event loops. Default value is "thread"',
+                            action='store', choices=['thread', 'loop'],
+                            default='thread', required=False, dest='engine')
+
+        parser.add_argument('--loops',
+                            help='Number of event loops used by "loop" '
+                                 'engine. Use 0 to create one loop per CPU '
+                                 'core. Default value is 1',
+                            default=1, type=int, required=False,
+                            dest='loops')
+
+        parser.add_argument('--req-timeout',
+                            help='Deadline of each request in seconds. A '
+                                 'request that is not answered in time is '
+                                 'counted as "timeout". '
+                                 'Default value is 0 (no deadline)',
+                            default=0, type=float, required=False,
+                            dest='req_timeout')
+
+        parser.add_argument('--retries',
+                            help='Number of retries of a request that timed '
+                                 'out or was not acknowledged by the pool. '
+                                 'Default value is 0',
+                            default=0, type=int, required=False,
+                            dest='retries')
+
+        parser.add_argument('--backoff',
+                            help='Delay in seconds before the first retry, '
+                                 'it is doubled after each retry. '
+                                 'Default value is 0.5',
+                            default=0.5, type=float, required=False,
+                            dest='backoff')
+
+        parser.add_argument('--rate',
+                            help='Send requests of load test at this '
+                                 'constant rate (transactions per second) '
+                                 'without waiting for responses. Latency is '
+                                 'measured from the intended send time. '
+                                 'Default value is 0 (each client waits for '
+                                 'a response before sending the next one)',
+                            default=0, type=float, required=False,
+                            dest='rate')
+
+        parser.add_argument('--arrival',
+                            help='Timeline of send times when "--rate" is '
+                                 'used. Default value is "fixed"',
+                            action='store', choices=['fixed', 'poisson'],
+                            default='fixed', required=False, dest='arrival')
+
+        parser.add_argument('--ramp',
+                            help='With "-l", increase the offered load in '
+                                 'steps to find the saturation point. '
+                                 '"clients" ramps the number of clients, '
+                                 '"rate" ramps the constant arrival rate',
+                            action='store', choices=['clients', 'rate'],
+                            default=None, required=False, dest='ramp')
+
+        parser.add_argument('--ramp-start',
+                            help='Load of the first ramp step. '
+                                 'Default value is 10',
+                            default=10, type=float, required=False,
+                            dest='ramp_start')
+
+        parser.add_argument('--ramp-step',
+                            help='Load added in each ramp step. '
+                                 'Default value is 10',
+                            default=10, type=float, required=False,
+                            dest='ramp_step')
+
+        parser.add_argument('--ramp-steps',
+                            help='Maximum number of ramp steps. '
+                                 'Default value is 10',
+                            default=10, type=int, required=False,
+                            dest='ramp_steps')
+
+        parser.add_argument('--dwell',
+                            help='Duration of each ramp step in seconds. '
+                                 'Default value is 30',
+                            default=30, type=int, required=False,
+                            dest='dwell')
+
+        parser.add_argument('--max-p99',
+                            help='Stop ramping when p99 latency (seconds) '
+                                 'of a step is greater than this value. '
+                                 'Default value is 0 (no limit)',
+                            default=0, type=float, required=False,
+                            dest='max_p99')
+
+        parser.add_argument('--max-error-rate',
+                            help='Stop ramping when the ratio of failed '
+                                 'requests of a step is greater than this '
+                                 'value. Default value is 0.05',
+                            default=0.05, type=float, required=False,
+                            dest='max_error_rate')
+
+        parser.add_argument('--plateau',
+                            help='Stop ramping when throughput of a step '
+                                 'grows less than this ratio over the best '
+                                 'previous step. Default value is 0.05',
+                            default=0.05, type=float, required=False,
+                            dest='plateau')
+
+        parser.add_argument('--processes',
+                            help='Number of worker processes. Clients are '
+                                 'divided equally among processes and each '
+                                 'process uses its own pool and wallet. '
+                                 'Default value is 1',
+                            default=1, type=int, required=False,
+                            dest='processes')
+
+        parser.add_argument('--coordinator',
+                            help='Run as coordinator listening on '
+                                 '"host:port". Clients are divided among '
+                                 'the agents and their results are merged '
+                                 'into one report',
+                            default=None, required=False,
+                            dest='coordinator')
+
+        parser.add_argument('--agents',
+                            help='Number of agents the coordinator waits '
+                                 'for. Default value is 1',
+                            default=1, type=int, required=False,
+                            dest='agents')
+
+        parser.add_argument('--agent-timeout',
+                            help='Seconds that the coordinator waits for '
+                                 'the agents to connect and then for their '
+                                 'results. The shard of an agent that does '
+                                 'not answer in time is counted as failed. '
+                                 'Default value is 3600',
+                            default=3600, type=int, required=False,
+                            dest='agent_timeout')
+
+        parser.add_argument('--agent',
+                            help='Run as agent of the coordinator at '
+                                 '"host:port". The agent receives its mode '
+                                 'and arguments from the coordinator',
+                            default=None, required=False, dest='agent')
+
         parser.add_argument('-k',
                             help='Kind of request to be sent. '
                                  'The default value will be "nym"',
@@ -122,16 +488,36 @@ class Options:
 
 class PerformanceTestRunner:
     modes = ["-t", "-l", "-a", "-g"]
-
-    def __init__(self):
-        self.options = Options().args
+    counter_labels = {'retried_req': 'Total retried requests',
+                      'aux_req': 'Total auxiliary NYM requests',
+                      'aux_failed_req': 'Total failed auxiliary NYM requests',
+                      'aux_time': 'Total time of auxiliary NYM requests '
+                                  '(seconds)',
+                      'negative_req': 'Total requests of missing targets',
+                      'cache_hit': 'Total read cache hits',
+                      'cache_miss': 'Total read cache misses',
+                      'cache_eviction': 'Total read cache evictions',
+                      'cache_expired': 'Total expired read cache entries',
+                      'hedged_req': 'Total hedged (duplicate) requests',
+                      'hedge_won': 'Total hedged requests answered first',
+                      'failed_shard': 'Total shards that exited without '
+                                      'result'}
+
+    def __init__(self, options=None, shard=None):
+        """
+        :param options: (optional) parsed options. Command line arguments
+                        are parsed if it is not passed.
+        :param shard: (optional) index of the worker process that runs
+                      this runner in "--processes" mode.
+        """
+        self.options = options if options else Options().args
+        self.shard = shard
 
         self.tester = None
 
-        temp = 0
-        for mode in PerformanceTestRunner.modes:
-            if mode in sys.argv:
-                temp += 1
+        temp = [self.options.adding, self.options.getting,
+                self.options.loading,
+                self.options.simulate_traffic].count(True)
 
         if temp == 0:
             utils.print_error(
@@ -146,23 +532,34 @@ class PerformanceTestRunner:
                 'cannot exist at the same time\n')
             sys.exit(1)
 
+        if self.options.adding and self.options.corpus_cache:
+            error = perf_add_requests.PerformanceTesterForAddingRequest.\
+                check_corpus_cache(self.options.kind, self.options.presign)
+            if error:
+                utils.force_print_error_to_console(error)
+                sys.exit(1)
+
         self.list_tester = list()
 
         self.start_time = self.finish_time = 0
-        self.lowest = self.fastest = 0
+        self.latencies = dict()
+        self.series = dict()
+        self.counters = dict()
         self.passed_req = self.failed_req = 0
+        self.failed_shards = 0
         self.result_path = os.path.join(os.path.dirname(__file__), 'results')
         utils.create_folder(self.result_path)
-        log_path = os.path.join(os.path.dirname(__file__), 'logs')
-        utils.create_folder(log_path)
+        self.log_path = os.path.join(os.path.dirname(__file__), 'logs')
+        utils.create_folder(self.log_path)
 
         now = time.strftime("%d-%m-%Y_%H-%M-%S")
         self.result_path = os.path.join(self.result_path,
                                         'result_{}.txt'.format(now))
 
-        log_path = os.path.join(
-            log_path, self.create_log_file_name())
-        requests_sender.RequestsSender.init_log_file(log_path)
+        # A payload sweep opens a log file for each profile.
+        if not self.is_payload_sweep():
+            requests_sender.RequestsSender.init_log_file(os.path.join(
+                self.log_path, self.create_log_file_name()))
         utils.create_folder(self.options.info_dir)
 
     def run(self):
@@ -172,27 +569,238 @@ class PerformanceTestRunner:
 
         utils.print_header("Start {}...\n".format(self.get_kind_of_test()))
 
+        if self.options.loading and self.options.ramp:
+            self.run_ramp()
+            return
+
+        if self.is_payload_sweep():
+            self.run_payload_sweep()
+            return
+
+        self.run_testers()
+        with open(self.result_path, 'w') as result:
+            self.write_result(result)
+        self.write_result(sys.stdout)
+        self.write_series()
+        requests_sender.RequestsSender.close_log_file()
+
+        utils.print_header("\nFinish {}\n".format(self.get_kind_of_test()))
+
+    def run_testers(self):
+        """
+        Start the testers in the agents, in worker processes or in current
+        process and collect their result.
+        """
         if not self.options.log:
             utils.start_capture_console()
         self.start_time = time.time()
-        if self.options.adding or self.options.getting \
-                and self.options.clients > 1:
-            self.start_tester_in_thread()
+        if self.options.coordinator:
+            self.start_tester_in_agents()
+        elif self.options.processes > 1:
+            self.start_tester_in_processes()
         else:
-            self.list_tester.append(self.create_tester())
-            utils.run_async_method(None, self.list_tester[-1].test)
+            self.start_testers()
 
         self.finish_time = time.time()
 
         utils.stop_capture_console()
         self.collect_result()
+
+    def run_ramp(self):
+        """
+        Run the step-load ramp and write its result.
+        """
+        ramp = perf_ramp.StepLoadRamp(
+            self.options.ramp, self.options.ramp_start,
+            self.options.ramp_step, self.options.ramp_steps,
+            self.options.dwell, self.options.clients, self.options.max_p99,
+            self.options.max_error_rate, self.options.plateau,
+            self.options.log, engine=self.options.engine,
+            loops=self.options.loops, arrival=self.options.arrival,
+            payload=self.options.payload, **self.create_sender_options())
+        ramp.run()
+
         with open(self.result_path, 'w') as result:
-            self.write_result(result)
-        self.write_result(sys.stdout)
+            ramp.write_result(result)
+        ramp.write_result(sys.stdout)
         requests_sender.RequestsSender.close_log_file()
 
         utils.print_header("\nFinish {}\n".format(self.get_kind_of_test()))
 
+    def run_payload_sweep(self):
+        """
+        Run the test once for each payload profile and write throughput
+        and latency of each profile. Each profile is run the same way as
+        a single test and has its own log file.
+        """
+        sweep_options = self.options
+        lst_result = list()
+        for payload in sweep_options.payload_sweep.split(','):
+            payload = payload.strip()
+            if payload not in requests_builder.RequestBuilder.\
+                    payload_profiles:
+                utils.force_print_error_to_console(
+                    'Unknown payload profile "{}". Skip...\n'.format(payload))
+                continue
+
+            self.options = argparse.Namespace(**vars(sweep_options))
+            self.options.payload = payload
+            self.options.payload_sweep = None
+            self.list_tester = list()
+            self.failed_shards = 0
+            requests_sender.RequestsSender.init_log_file(os.path.join(
+                self.log_path, self.create_log_file_name()))
+            self.run_testers()
+            requests_sender.RequestsSender.close_log_file()
+            lst_result.append((payload, perf_tester.TesterResult(
+                passed_req=self.passed_req, failed_req=self.failed_req,
+                start_time=self.start_time, finish_time=self.finish_time,
+                latencies=self.latencies, series=self.series,
+                counters=self.counters)))
+        self.options = sweep_options
+
+        with open(self.result_path, 'w') as result:
+            PerformanceTestRunner.write_payload_sweep(lst_result, result)
+        PerformanceTestRunner.write_payload_sweep(lst_result, sys.stdout)
+
+        utils.print_header("\nFinish {}\n".format(self.get_kind_of_test()))
+
+    @staticmethod
+    def write_payload_sweep(lst_result, result_file):
+        """
+        Write throughput and latency of each payload profile.
+
+        :param lst_result: list of (payload profile,
+                           perf_tester.TesterResult of the profile).
+        :param result_file: the file that result will be written.
+        """
+        print("\n -----------  Payload sweep  -----------", file=result_file)
+        for payload, result in lst_result:
+            elapsed_time = result.finish_time - result.start_time
+            passed = metrics.merge_latencies(
+                [{'passed': histogram}
+                 for key, histogram in result.latencies.items()
+                 if key.endswith('/passed')]).get('passed',
+                                                  metrics.LatencyHistogram())
+            print("\n {}: {} => {:.1f} txns/s, passed: {}, failed: {}".format(
+                payload, requests_builder.RequestBuilder.payload_profiles[
+                    payload],
+                result.passed_req / elapsed_time if elapsed_time > 0 else 0,
+                result.passed_req, result.failed_req), file=result_file)
+            print("   " + metrics.format_latency_summary('passed', passed),
+                  file=result_file)
+            if result.counters.get('failed_shard'):
+                print("   {}: {}".format(
+                    PerformanceTestRunner.counter_labels['failed_shard'],
+                    result.counters['failed_shard']), file=result_file)
+
+    def start_testers(self):
+        """
+        Create and start the testers in current process.
+        """
+        if self.options.adding or self.options.getting \
+                and self.options.clients > 1:
+            if self.options.engine == 'loop':
+                self.start_tester_in_loop()
+            else:
+                self.start_tester_in_thread()
+        else:
+            self.list_tester.append(self.create_tester())
+            utils.run_async_method(None, self.list_tester[-1].test)
+
+    def start_tester_in_processes(self):
+        """
+        Shard the clients across worker processes, start them and take
+        their results back into list of tester.
+        """
+        processes = dict()
+        queue = multiprocessing.Queue()
+        for shard, options in enumerate(self.create_shard_options(
+                self.options.processes)):
+            process = multiprocessing.Process(
+                target=PerformanceTestRunner.run_shard_in_process,
+                kwargs={'options': options, 'shard': shard,
+                        'queue': queue})
+            process.start()
+            processes[shard] = process
+
+        for shard, results in utils.take_process_results(queue, processes):
+            if results is None:
+                utils.force_print_error_to_console(
+                    'Shard {} exited with code {} without result\n'.format(
+                        shard, processes[shard].exitcode))
+                self.failed_shards += 1
+                continue
+            for result in results:
+                self.list_tester.append(
+                    perf_tester.TesterResult.from_dict(result))
+
+        for process in processes.values():
+            process.join()
+
+    def create_shard_options(self, number_of_shards):
+        """
+        Divide the clients (and transactions of load test) into shards.
+
+        :param number_of_shards: number of shards.
+        :return: list of options, one for each non-empty shard.
+        """
+        number_of_shards = min(number_of_shards, self.options.clients)
+        clients = requests_builder.RequestBuilder.divide(
+            number_of_shards, self.options.clients)
+        txns = requests_builder.RequestBuilder.divide(
+            number_of_shards, self.options.txns)
+
+        lst_options = list()
+        for i in range(number_of_shards):
+            options = argparse.Namespace(**vars(self.options))
+            options.clients = clients[i]
+            options.first_client = sum(clients[:i])
+            options.processes = 1
+            if self.options.loading:
+                options.txns = txns[i]
+                options.rate = \
+                    self.options.rate * clients[i] / self.options.clients
+            lst_options.append(options)
+
+        return lst_options
+
+    def start_tester_in_agents(self):
+        """
+        Hand out the shards of clients to the agents and take their results
+        back into list of tester.
+        """
+        coordinator = perf_distributed.Coordinator(
+            self.options.coordinator, self.options.agents,
+            timeout=self.options.agent_timeout)
+        results, failed_shards = coordinator.run(
+            self.create_shard_options(self.options.agents))
+        self.failed_shards += failed_shards
+        for result in results:
+            self.list_tester.append(
+                perf_tester.TesterResult.from_dict(result))
+
+    @staticmethod
+    def run_shard(options, shard) -> list:
+        """
+        Run the testers of one shard.
+
+        :return: list of tester results as dictionaries.
+        """
+        runner = PerformanceTestRunner(options, shard)
+        runner.start_testers()
+        requests_sender.RequestsSender.close_log_file()
+        return [perf_tester.TesterResult.from_tester(tester).to_dict()
+                for tester in runner.list_tester]
+
+    @staticmethod
+    def run_shard_in_process(options, shard, queue):
+        """
+        Process function that runs the testers of one shard and puts
+        their results into queue.
+        """
+        queue.put((shard, PerformanceTestRunner.run_shard(options, shard)))
+
     def collect_result(self):
         """
         Collect all necessary information to make the result.
@@ -202,7 +810,16 @@ class PerformanceTestRunner:
             self.failed_req += tester.failed_req
             self.passed_req += tester.passed_req
 
-        self.find_lowest_and_fastest_transaction()
+        self.latencies = metrics.merge_latencies(
+            [tester.latencies for tester in self.list_tester])
+        self.series = metrics.merge_series(
+            [tester.series for tester in self.list_tester])
+        self.counters = dict()
+        for tester in self.list_tester:
+            for name, value in tester.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+        if self.failed_shards:
+            self.counters['failed_shard'] = self.failed_shards
 
         self.find_start_and_finish_time()
 
@@ -230,11 +847,6 @@ class PerformanceTestRunner:
             hours, minutes, seconds) + "  -----------", file=result_file)
         print("\n Kind: " + self.get_kind_of_test(), file=result_file)
         print("\n Client(s): " + str(self.options.clients), file=result_file)
-        print("\n Fastest transaction (individual thread): {} second(s)".
-              format(str(self.fastest)),
-              file=result_file)
-        print("\n Lowest transaction (individual thread): {} second(s)".
-              format(str(self.lowest)), file=result_file)
         print("\n Transaction per client: " + str(int(txns_per_client)),
               file=result_file)
         print("\n Total requested transactions: " + str(int(ttl_txns)),
@@ -243,32 +855,119 @@ class PerformanceTestRunner:
               file=result_file)
         print("\n Total failed transactions: " + str(self.failed_req),
               file=result_file)
-        print("\n Average time of a transaction "
-              "(multiple threads): {} second(s)".
-              format(str((self.finish_time - self.start_time) / ttl_txns)),
-              file=result_file)
+        self.write_failures(result_file)
+        for name in sorted(self.counters):
+            value = self.counters[name]
+            if isinstance(value, float):
+                value = '{:.6f}'.format(value)
+            print("\n {}: {}".format(
+                PerformanceTestRunner.counter_labels.get(name, name),
+                value), file=result_file)
         print("\n Estimated transactions per second: " + str(txns_per_second),
               file=result_file)
+        self.write_latencies(result_file)
+        self.write_hedging(result_file)
 
-    def find_lowest_and_fastest_transaction(self):
+    def write_failures(self, result_file):
         """
-        Find lowest and fastest transactions.
+        Write the number of failed transactions of each class of failure.
+
+        :param result_file: the file that result will be written.
         """
-        self.lowest = self.list_tester[0].lowest_txn
-        self.fastest = self.list_tester[0].fastest_txn
-        for tester in self.list_tester:
-            temp_lowest = tester.lowest_txn
-            temp_fastest = tester.fastest_txn
-            if self.lowest < temp_lowest:
-                self.lowest = temp_lowest
-            if self.fastest > temp_fastest:
-                self.fastest = temp_fastest
+        failures = dict()
+        for key, histogram in self.latencies.items():
+            kind, _, status = key.rpartition('/')
+            if kind.endswith(requests_sender.RequestsSender.unhedged_suffix):
+                continue
+            if status != 'passed':
+                failures[status] = failures.get(status, 0) + histogram.count
+
+        for status in sorted(failures):
+            print("   {}: {}".format(status, failures[status]),
+                  file=result_file)
+
+    def write_latencies(self, result_file):
+        """
+        Write latency percentiles of each kind and status of request.
+
+        :param result_file: the file that result will be written.
+        """
+        print("\n Latency of transactions:", file=result_file)
+        for key in sorted(self.latencies):
+            print("   " + metrics.format_latency_summary(
+                key, self.latencies[key]), file=result_file)
+
+        passed = [histogram for key, histogram in self.latencies.items()
+                  if key.endswith('/passed') and not key.endswith(
+                      requests_sender.RequestsSender.unhedged_suffix +
+                      '/passed')]
+        if len(passed) > 1:
+            total = metrics.merge_latencies(
+                [{'all/passed': histogram} for histogram in passed])
+            print("   " + metrics.format_latency_summary(
+                'all/passed', total['all/passed']), file=result_file)
+
+    def write_hedging(self, result_file):
+        """
+        Write the p99 latency of hedged "GET" requests against the p99
+        latency that they would have had without hedging and the extra
+        requests that hedging sent.
+        Latency without hedging is measured per submission, so it does not
+        include the backoff of retries.
+
+        :param result_file: the file that result will be written.
+        """
+        suffix = requests_sender.RequestsSender.unhedged_suffix
+        unhedged_keys = [key for key in self.latencies
+                         if key.rpartition('/')[0].endswith(suffix)]
+        if not unhedged_keys:
+            return
+
+        print("\n Hedging:", file=result_file)
+        for key in sorted(unhedged_keys):
+            kind, _, status = key.rpartition('/')
+            if status != 'passed':
+                continue
+            kind = kind[:-len(suffix)]
+            hedged = self.latencies.get(kind + '/passed')
+            if hedged is None:
+                continue
+            hedged_p99 = hedged.percentile(99)
+            unhedged_p99 = self.latencies[key].percentile(99)
+            change = (hedged_p99 / unhedged_p99 - 1) * 100 \
+                if unhedged_p99 else 0
+            print("   {} - p99: {:.6f} second(s), without hedging: {:.6f} "
+                  "second(s) ({:+.1f}%)".format(
+                      kind, hedged_p99, unhedged_p99, change),
+                  file=result_file)
+
+        submitted = sum(self.latencies[key].count for key in unhedged_keys)
+        hedged_req = self.counters.get('hedged_req', 0)
+        print("   Extra load: {} hedged request(s) for {} request(s) "
+              "({:.1f}%)".format(hedged_req, submitted,
+                                 hedged_req / submitted * 100
+                                 if submitted else 0), file=result_file)
+
+    def write_series(self):
+        """
+        Write per-second throughput and latency next to the result file.
+        """
+        if not self.series:
+            return
+        path = os.path.splitext(self.result_path)[0]
+        metrics.write_series(self.series, path + '_series.csv',
+                             path + '_series.jsonl')
+        utils.print_ok_blue('Time series are written to {}_series.csv and '
+                            '{}_series.jsonl'.format(path, path))
 
     def find_start_and_finish_time(self):
         """
         Find the earliest time that a client is started and latest time that a
         client is finished.
         """
+        if not self.list_tester:
+            return
+
         self.start_time = self.list_tester[0].start_time
         self.finish_time = self.list_tester[0].finish_time
 
@@ -284,8 +983,8 @@ class PerformanceTestRunner:
         Create thread and start all the tester in list.
         """
         threads = list()
-        for _ in range(self.options.clients):
-            tester = self.create_tester()
+        for client in range(self.options.clients):
+            tester = self.create_tester(client)
             self.list_tester.append(tester)
             thread = threading.Thread(target=self.run_tester_in_thread,
                                       kwargs={'tester': tester})
@@ -296,6 +995,17 @@ class PerformanceTestRunner:
         for thread in threads:
             thread.join()
 
+    def start_tester_in_loop(self):
+        """
+        Create all the tester in list and run them as coroutines.
+        """
+        for client in range(self.options.clients):
+            self.list_tester.append(self.create_tester(client))
+
+        engine = worker_engine.WorkerEngine(self.options.loops)
+        utils.run_async_method(None, engine.run,
+                               [tester.test for tester in self.list_tester])
+
     @staticmethod
     def run_tester_in_thread(tester):
         """
@@ -305,34 +1015,110 @@ class PerformanceTestRunner:
         utils.run_async_method(loop, tester.test)
         loop.close()
 
-    def create_tester(self):
+    def create_tester(self, client=0):
         """
         Create tester base mode "-a", "-t", "-g", "-l".
 
+        :param client: index of the client in this runner. With "-a",
+                       each client derives the DIDs of "--did-seed" from
+                       its own range of seeds.
         :return: tester
         """
         if self.options.adding:
             return perf_add_requests.PerformanceTesterForAddingRequest(
                 self.options.info_dir, self.options.txns, self.options.kind,
-                thread_num=self.options.thread_num, log=self.options.log)
+                thread_num=self.options.thread_num, log=self.options.log,
+                inflight=self.options.inflight, engine=self.options.engine,
+                loops=self.options.loops, presign=self.options.presign,
+                build_concurrency=self.options.build_concurrency,
+                build_procs=self.options.build_procs,
+                pipeline=self.options.pipeline,
+                queue_size=self.options.queue_size,
+                persist=self.options.persist,
+                corpus_format=self.options.corpus_format,
+                corpus_cache=self.options.corpus_cache,
+                did_pool=self.options.did_pool,
+                did_seed=self.options.did_seed,
+                did_offset=(getattr(self.options, 'first_client', 0) +
+                            client) * self.options.txns,
+                onboard=self.options.onboard,
+                payload=self.options.payload,
+                info_store=self.options.info_store,
+                **self.create_sender_options())
 
         elif self.options.getting:
             return perf_get_requests.PerformanceTesterGetSentRequestFromLedger(
                 self.options.info_dir, self.options.kind,
-                self.options.thread_num, log=self.options.log)
+                self.options.thread_num, log=self.options.log,
+                inflight=self.options.inflight, engine=self.options.engine,
+                loops=self.options.loops, persist=self.options.persist,
+                corpus_format=self.options.corpus_format,
+                build_concurrency=self.options.build_concurrency,
+                pipeline=self.options.pipeline,
+                queue_size=self.options.queue_size,
+                info_store=self.options.info_store,
+                sample=self.options.sample,
+                sample_size=self.options.sample_size,
+                since=self.options.since, until=self.options.until,
+                distribution=self.options.distribution or 'once',
+                request_num=self.options.txns,
+                zipf_exponent=self.options.zipf_exponent,
+                hot_set=self.options.hot_set,
+                hot_ratio=self.options.hot_ratio,
+                negative_ratio=self.options.negative_ratio,
+                cache_size=self.options.cache_size,
+                cache_ttl=self.options.cache_ttl,
+                hedge_delay=self.options.hedge_delay,
+                hedge_percentile=self.options.hedge_percentile,
+                **self.create_sender_options())
 
         elif self.options.loading:
             return perf_load.TesterSimulateLoad(
                 self.options.clients, self.options.txns,
-                self.options.time_out, self.options.log)
+                self.options.time_out, self.options.log,
+                engine=self.options.engine, loops=self.options.loops,
+                rate=self.options.rate, arrival=self.options.arrival,
+                payload=self.options.payload,
+                **self.create_sender_options())
 
         elif self.options.simulate_traffic:
             return perf_traffic.TesterSimulateTraffic(
                 self.options.clients, self.options.txns,
-                self.options.time_out, self.options.log)
+                self.options.time_out, self.options.log,
+                engine=self.options.engine, loops=self.options.loops,
+                distribution=self.options.distribution
+                if self.options.distribution not in [None, 'once']
+                else 'uniform',
+                zipf_exponent=self.options.zipf_exponent,
+                hot_set=self.options.hot_set,
+                hot_ratio=self.options.hot_ratio,
+                negative_ratio=self.options.negative_ratio,
+                cache_size=self.options.cache_size,
+                cache_ttl=self.options.cache_ttl,
+                hedge_delay=self.options.hedge_delay,
+                hedge_percentile=self.options.hedge_percentile,
+                **self.create_sender_options())
 
         return None
 
+    def create_sender_options(self) -> dict:
+        """
+        Return the timeout and retry arguments of the testers.
+        """
+        return {'req_timeout': self.options.req_timeout,
+                'retries': self.options.retries,
+                'backoff': self.options.backoff}
+
+    def is_payload_sweep(self) -> bool:
+        """
+        Return True if the test is run once for each payload profile
+        ("--payload-sweep" with "-a" or "-l" but not a ramp).
+        """
+        if self.options.loading and self.options.ramp:
+            return False
+        return bool(self.options.payload_sweep) and \
+            (self.options.adding or self.options.loading)
+
     def get_kind_of_test(self) -> str:
         """
         Return kind of testing.
@@ -345,6 +1131,8 @@ class PerformanceTestRunner:
             return "sending 'GET {}' requests".format(self.options.kind)
         elif self.options.simulate_traffic:
             return "simulating traffic"
+        elif self.options.loading and self.options.ramp:
+            return "performing step-load ramp"
         elif self.options.loading:
             return "performing load test"
 
@@ -358,6 +1146,10 @@ class PerformanceTestRunner:
         """
         temp = 'get' if self.options.getting else ""
         now = time.strftime("%d-%m-%Y_%H-%M-%S")
+        if self.shard is not None:
+            now += '_shard{}'.format(self.shard)
+        if self.options.payload != 'default':
+            now += '_{}'.format(self.options.payload)
 
         if self.options.adding or self.options.getting:
             return '{}-perf-{}{}_{}.log'.format(self.options.clients, temp,
@@ -371,4 +1163,9 @@ class PerformanceTestRunner:
 
 
 if __name__ == '__main__':
-    PerformanceTestRunner().run()
+    opts = Options().args
+    if opts.agent:
+        perf_distributed.Agent(opts.agent,
+                               PerformanceTestRunner.run_shard).run()
+    else:
+        PerformanceTestRunner(opts).run()
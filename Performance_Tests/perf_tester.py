@@ -9,6 +9,7 @@ tester classes.
 
 import utils
 import json
+import metrics
 
 from indy import wallet, pool, signus
 from indy.error import IndyError
@@ -27,7 +28,9 @@ class Tester:
         self.threads = list()
         self.passed_req = self.failed_req = 0
         self.start_time = self.finish_time = 0
-        self.fastest_txn = self.lowest_txn = -1
+        self.latencies = dict()
+        self.series = dict()
+        self.counters = dict()
 
     async def test(self):
         """
@@ -181,3 +184,53 @@ class Tester:
             utils.print_error("Cannot delete pool."
                               "Skip deleting pool...")
             utils.print_error(str(e))
+
+
+class TesterResult:
+    """
+    Result of a tester that can be sent between processes.
+    It has the same result attributes as "Tester".
+    """
+    fields = ['passed_req', 'failed_req', 'start_time', 'finish_time',
+              'latencies', 'series', 'counters']
+
+    def __init__(self, **kwargs):
+        self.passed_req = self.failed_req = 0
+        self.start_time = self.finish_time = 0
+        self.latencies = dict()
+        self.series = dict()
+        self.counters = dict()
+        for field in TesterResult.fields:
+            if field in kwargs:
+                setattr(self, field, kwargs[field])
+
+    @staticmethod
+    def from_tester(tester):
+        """
+        Take the result of a tester.
+
+        :param tester: a finished tester.
+        :return: TesterResult.
+        """
+        return TesterResult(**{field: getattr(tester, field)
+                               for field in TesterResult.fields})
+
+    def to_dict(self) -> dict:
+        """
+        Return the result as a JSON serializable dictionary.
+        """
+        result = {field: getattr(self, field)
+                  for field in TesterResult.fields}
+        result['latencies'] = metrics.latencies_to_dict(self.latencies)
+        result['series'] = metrics.series_to_dict(self.series)
+        return result
+
+    @staticmethod
+    def from_dict(data: dict):
+        """
+        Create the result from a dictionary returned by "to_dict".
+        """
+        data = dict(data)
+        data['latencies'] = metrics.latencies_from_dict(data['latencies'])
+        data['series'] = metrics.series_from_dict(data['series'])
+        return TesterResult(**data)
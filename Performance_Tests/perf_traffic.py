@@ -17,6 +17,8 @@ import argparse
 import requests_sender
 import requests_builder
 import perf_add_requests
+import worker_engine
+import key_distribution
 
 from perf_tester import Tester
 
@@ -46,6 +48,56 @@ class Option:
                             action='store', type=int, 
                             default=100, dest='transactions_delay')
 
+        parser.add_argument('--engine',
+                            help='How the workers are run. "thread" creates '
+                                 'one thread per worker, "loop" runs all '
+                                 'workers as coroutines on event loops. '
+                                 'The default value will be "thread"',
+                            action='store', choices=['thread', 'loop'],
+                            default='thread', dest='engine')
+
+        parser.add_argument('--loops',
+                            help='Number of event loops used by "loop" '
+                                 'engine. Use 0 to create one loop per CPU '
+                                 'core. The default value will be 1',
+                            action='store', type=int, default=1,
+                            dest='loops')
+
+        parser.add_argument('--cache-size',
+                            help='Specify the maximum number of responses '
+                                 'of a client-side cache in front of "GET" '
+                                 'requests (least recently used responses '
+                                 'are evicted). Use 0 to disable the cache. '
+                                 'The default value will be 0',
+                            action='store', type=int, default=0,
+                            dest='cache_size')
+
+        parser.add_argument('--cache-ttl',
+                            help='Specify the seconds that a cached '
+                                 'response stays valid. Use 0 to keep '
+                                 'responses until they are evicted. '
+                                 'The default value will be 0',
+                            action='store', type=float, default=0,
+                            dest='cache_ttl')
+
+        parser.add_argument('--hedge-delay',
+                            help='Specify the seconds after which a '
+                                 'duplicate of a "GET" request that has not '
+                                 'been answered is sent. The first answer '
+                                 'is used. Use 0 to disable hedging. '
+                                 'The default value will be 0',
+                            action='store', type=float, default=0,
+                            dest='hedge_delay')
+
+        parser.add_argument('--hedge-percentile',
+                            help='Use this percentile (e.g. 95) of the '
+                                 'observed latency of "GET" requests as the '
+                                 'delay of hedging. "--hedge-delay" is used '
+                                 'until enough latencies are observed. '
+                                 'The default value will be 0 (not used)',
+                            action='store', type=float, default=0,
+                            dest='hedge_percentile')
+
         parser.add_argument('--log',
                             help='To see all log. If this flag does not exist,'
                                  'program just only print fail message',
@@ -57,6 +109,42 @@ class Option:
                             action='store', type=int,
                             default=100, dest='time_out')
 
+        parser.add_argument('--distribution',
+                            help='Popularity of the targets of "GET" '
+                                 'requests among the samples. '
+                                 'The default value will be "uniform"',
+                            action='store',
+                            choices=key_distribution.KeyDistribution.
+                            distributions,
+                            default='uniform', dest='distribution')
+
+        parser.add_argument('--zipf-exponent',
+                            help='Exponent of "--distribution zipf". '
+                                 'The default value will be 1.0',
+                            action='store', type=float, default=1.0,
+                            dest='zipf_exponent')
+
+        parser.add_argument('--hot-set',
+                            help='Percentage of samples that are hot with '
+                                 '"--distribution hot". '
+                                 'The default value will be 20',
+                            action='store', type=float, default=20,
+                            dest='hot_set')
+
+        parser.add_argument('--hot-ratio',
+                            help='Percentage of "GET" requests that go to '
+                                 'the hot samples with "--distribution hot". '
+                                 'The default value will be 80',
+                            action='store', type=float, default=80,
+                            dest='hot_ratio')
+
+        parser.add_argument('--negative-ratio',
+                            help='Percentage of "GET" requests whose '
+                                 'targets do not exist on ledger. '
+                                 'The default value will be 0',
+                            action='store', type=float, default=0,
+                            dest='negative_ratio')
+
         parser.add_argument('--init',
                             help='To build "GET" request, we need to '
                                  'send "ADD" request first. This argument is '
@@ -104,7 +192,11 @@ class TesterSimulateTraffic(Tester):
     def __init__(self, number_of_clients: int = 2,
                  transactions_delay: int = 100,
                  time_out: int = 300, log=False,
-                 seed="000000000000000000000000Trustee1"):
+                 seed="000000000000000000000000Trustee1",
+                 engine='thread', loops=1, req_timeout=0, retries=0,
+                 backoff=0.5, distribution='uniform', zipf_exponent=1.0,
+                 hot_set=20, hot_ratio=80, negative_ratio=0, cache_size=0,
+                 cache_ttl=0, hedge_delay=0, hedge_percentile=0):
         super().__init__(log=log, seed=seed)
         utils.run_async_method(
             None, TesterSimulateTraffic._prepare_samples_for_get_req,
@@ -113,37 +205,60 @@ class TesterSimulateTraffic(Tester):
         if time_out <= 0 or transactions_delay <= 0 or number_of_clients <= 0:
             return
 
+        self.engine = engine
+        self.loops = loops
         self.transactions_delay = transactions_delay
         self.time_out = time_out
         self.number_of_clients = number_of_clients
         self.current_total_txn = 0
         self.__current_time = time.time()
         self.__lock = threading.Lock()
-        self.__sender = requests_sender.RequestsSender()
+        self.__resume_time = 0
+        self.__sender = requests_sender.RequestsSender(
+            timeout=req_timeout, retries=retries, backoff=backoff,
+            cache_size=cache_size, cache_ttl=cache_ttl,
+            hedge_delay=hedge_delay, hedge_percentile=hedge_percentile)
+        self.__key_distributions = {
+            kind: key_distribution.KeyDistribution(
+                samples, distribution, zipf_exponent, hot_set, hot_ratio,
+                negative_ratio)
+            for kind, samples in
+            TesterSimulateTraffic.__sample_req_info.items()}
 
     async def _test(self):
         """
         Override from "Tester" class to implement testing steps.
         """
-        lst_threads = list()
         self.__current_time = time.time()
-        for _ in range(self.number_of_clients):
-            thread = threading.Thread(target=self.__simulate_client)
-            thread.setDaemon(True)
-            thread.start()
-            lst_threads.append(thread)
-
-        for thread in lst_threads:
-            thread.join(self.time_out * 1.1)
-
-        self.passed_req = self.__sender.passed_req
-        self.failed_req = self.__sender.failed_req
-        self.fastest_txn = self.__sender.fastest_txn
-        self.lowest_txn = self.__sender.lowest_txn
+        if self.engine == 'loop':
+            workers = [self.__simulate_client_in_loop] * \
+                self.number_of_clients
+            await worker_engine.WorkerEngine(self.loops).run(
+                workers, self.time_out * 1.1)
+        else:
+            lst_threads = list()
+            for _ in range(self.number_of_clients):
+                thread = threading.Thread(target=self.__simulate_client)
+                thread.setDaemon(True)
+                thread.start()
+                lst_threads.append(thread)
+
+            for thread in lst_threads:
+                thread.join(self.time_out * 1.1)
+
+        result = self.__sender.snapshot()
+        self.passed_req = result.passed_req
+        self.failed_req = result.failed_req
+        self.latencies = result.latencies
+        self.series = result.series
+        self.counters = result.counters
 
     def __update(self):
         """
         Synchronize within threads to update some necessary information.
+        Between two sets, all clients wait until "self.__resume_time"
+        (clients sleep in their event loop so that a shared loop is
+        not blocked).
         """
         self.__lock.acquire()
 
@@ -152,7 +267,7 @@ class TesterSimulateTraffic(Tester):
 
         if self.current_total_txn != 0 and \
                 self.current_total_txn % self.transactions_delay == 0:
-            time.sleep(random.randint(1, 10))
+            self.__resume_time = time.time() + random.randint(1, 10)
 
         self.current_total_txn += 1
         self.__lock.release()
@@ -162,21 +277,32 @@ class TesterSimulateTraffic(Tester):
         Simulate a client to create real time traffic.
         """
         loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        utils.run_async_method(loop, self.__simulate_client_in_loop)
+        loop.close()
+
+    async def __simulate_client_in_loop(self):
+        """
+        Simulate a client in the current event loop.
+        """
         args = {"wallet_handle": self.wallet_handle,
                 "pool_handle": self.pool_handle,
                 "submitter_did": self.submitter_did}
 
-        asyncio.set_event_loop(loop)
         while True:
             self.__update()
+            while time.time() < self.__resume_time:
+                await asyncio.sleep(self.__resume_time - time.time())
             if time.time() - self.__current_time >= self.time_out:
                 break
 
-            self.finish_time = utils.run_async_method(
-                loop, TesterSimulateTraffic._build_and_send_request,
-                self.__sender, args)
+            response_time = \
+                await TesterSimulateTraffic._build_and_send_request(
+                    self.__sender, args, self.__key_distributions)
+            if response_time:
+                self.finish_time = response_time
 
-        loop.close()
+        await self.__sender.wait_for_pending_hedges()
 
     @staticmethod
     async def generate_sample_request_info(kind,
@@ -240,32 +366,43 @@ class TesterSimulateTraffic(Tester):
         return random.choice(TesterSimulateTraffic.__kinds_of_request)
 
     @staticmethod
-    def _random_sample_for_get_request(kind: str):
+    def _random_sample_for_get_request(kind: str, key_distributions=None):
         """
         Choice randomly a sample of request info base on kind of request.
 
         :param kind: kind of request (get_nym, get_attribute,
                      get_claim, get_schema).
-        :return: a random sample of request info.
+        :param key_distributions: (optional) key_distribution.KeyDistribution
+                                  of the samples of each kind. Samples are
+                                  chosen uniformly if it is not passed.
+        :return: a random sample of request info and whether its target
+                 exists on ledger or not.
         """
-        if kind.startswith("get_"):
-            return random.choice(
-                TesterSimulateTraffic.__sample_req_info[kind.replace(
-                    "get_", "")])
-        return ""
+        if not kind.startswith("get_"):
+            return "", True
+        kind = kind.replace("get_", "")
+        if key_distributions:
+            return key_distributions[kind].choose()
+        return random.choice(TesterSimulateTraffic.__sample_req_info[kind]), \
+            True
 
     @staticmethod
-    async def _build_and_send_request(sender, args):
+    async def _build_and_send_request(sender, args, key_distributions=None):
         """
         Build a request and send it onto ledger.
 
         :param sender: send the request.
         :param args: contains some arguments to send request to ledger
                      (pool handle, wallet handle, submitter did)
+        :param key_distributions: (optional) key_distribution.KeyDistribution
+                                  of the samples of each kind.
         :return: response time.
         """
         kind = TesterSimulateTraffic._random_req_kind()
-        data = TesterSimulateTraffic._random_sample_for_get_request(kind)
+        data, exists = TesterSimulateTraffic._random_sample_for_get_request(
+            kind, key_distributions)
+        if not exists:
+            sender.get_shard().count('negative_req')
 
         req = await requests_builder.RequestBuilder.build_request(args, kind,
                                                                   data)
@@ -278,7 +415,17 @@ if __name__ == '__main__':
     
     tester = TesterSimulateTraffic(number_of_clients=opts.clients, 
                                    transactions_delay=opts.transactions_delay,
-                                   time_out=opts.time_out, log=opts.log)
+                                   time_out=opts.time_out, log=opts.log,
+                                   engine=opts.engine, loops=opts.loops,
+                                   distribution=opts.distribution,
+                                   zipf_exponent=opts.zipf_exponent,
+                                   hot_set=opts.hot_set,
+                                   hot_ratio=opts.hot_ratio,
+                                   negative_ratio=opts.negative_ratio,
+                                   cache_size=opts.cache_size,
+                                   cache_ttl=opts.cache_ttl,
+                                   hedge_delay=opts.hedge_delay,
+                                   hedge_percentile=opts.hedge_percentile)
     
     utils.run_async_method(None, tester.test)
 
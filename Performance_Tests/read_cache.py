@@ -0,0 +1,77 @@
+"""
+Created on Apr 20, 2018
+
+@author: nhan.nguyen
+
+This module contains class "ReadCache" that models a client-side cache of
+"GET" responses with LRU eviction and time to live.
+"""
+
+import collections
+import json
+import threading
+import time
+
+
+class ReadCache:
+    def __init__(self, max_size: int, ttl=0):
+        """
+        :param max_size: maximum number of cached responses. The least
+                         recently used response is evicted when it is full.
+        :param ttl: seconds that a response stays valid (0 means forever).
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the cached response of key.
+
+        :return: (response or None, the response of key was expired or not).
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None, False
+            response, expire_time = entry
+            if expire_time and expire_time <= time.time():
+                del self.entries[key]
+                return None, True
+            self.entries.move_to_end(key)
+            return response, False
+
+    def put(self, key, response) -> int:
+        """
+        Cache the response of key.
+
+        :return: number of evicted responses.
+        """
+        expire_time = time.time() + self.ttl if self.ttl else 0
+        evicted = 0
+        with self.lock:
+            self.entries[key] = (response, expire_time)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                evicted += 1
+
+        return evicted
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def make_key(req):
+        """
+        Make the key of a GET request from its target ("operation"), so the
+        same target is found whatever the request id is.
+
+        :param req: GET request (JSON string).
+        :return: key or None if the request cannot be parsed.
+        """
+        try:
+            return json.dumps(json.loads(req)['operation'], sort_keys=True)
+        except (ValueError, KeyError, TypeError):
+            return None
@@ -0,0 +1,308 @@
+"""
+Created on Apr 9, 2018
+
+@author: nhan.nguyen
+
+This module contains classes "CorpusWriter" and "Corpus" that store built
+requests in a binary corpus file and class "CorpusCache" that keeps built
+corpora to be reused by later runs.
+Each record is the length of the request, the flags and the length of the
+submitter did (big-endian) followed by the submitter did and the request.
+The offsets of records are kept in an index file next to the corpus so any
+record or slice of records can be read through mmap without reading the
+records before it.
+"""
+
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+
+from array import array
+
+
+class CorpusWriter:
+    header = struct.Struct('>IBH')
+    flag_signed = 1
+    flag_submitter_did = 2
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the corpus file. The index file is
+                     "path" + ".idx".
+        """
+        self.path = path
+        self.corpus_file = open(path, 'wb')
+        self.offsets = array('Q')
+        self.offset = 0
+
+    def append(self, envelope: dict):
+        """
+        Append one request.
+
+        :param envelope: dictionary with "request" and optional
+                         "submitter_did" and "signed".
+        """
+        req = envelope['request'].encode()
+        submitter_did = envelope.get('submitter_did', '').encode()
+        flags = 0
+        if envelope.get('signed'):
+            flags |= CorpusWriter.flag_signed
+        if submitter_did:
+            flags |= CorpusWriter.flag_submitter_did
+
+        self.offsets.append(self.offset)
+        self.corpus_file.write(CorpusWriter.header.pack(
+            len(req), flags, len(submitter_did)))
+        self.corpus_file.write(submitter_did)
+        self.corpus_file.write(req)
+        self.offset += CorpusWriter.header.size + len(submitter_did) + \
+            len(req)
+
+    def close(self):
+        """
+        Close the corpus file and write the index file.
+        """
+        self.corpus_file.close()
+        with open(self.path + '.idx', 'wb') as index_file:
+            self.offsets.tofile(index_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Corpus:
+    def __init__(self, path: str, temporary=False, new_req_ids=False):
+        """
+        Open a corpus written by "CorpusWriter".
+
+        :param path: path of the corpus file.
+        :param temporary: the corpus and index files are removed when all
+                          slices of the corpus are released.
+        :param new_req_ids: give the requests that are not signed a new
+                            request id when they are read, so a pool that
+                            has already seen them does not answer them
+                            with its stored replies.
+        """
+        self.path = path
+        self.temporary = temporary
+        self.new_req_ids = new_req_ids
+        self.lock = threading.Lock()
+        self.slice_count = 0
+        self.offsets = array('Q')
+        with open(path + '.idx', 'rb') as index_file:
+            self.offsets.frombytes(index_file.read())
+
+        self.data = None
+        if os.path.getsize(path):
+            with open(path, 'rb') as corpus_file:
+                self.data = mmap.mmap(corpus_file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index: int) -> dict:
+        """
+        Read one request.
+
+        :return: dictionary with "request" and, if they were written,
+                 "submitter_did" and "signed".
+        """
+        offset = self.offsets[index]
+        req_len, flags, did_len = CorpusWriter.header.unpack_from(self.data,
+                                                                  offset)
+        offset += CorpusWriter.header.size
+        envelope = {'request': self.data[offset + did_len:
+                                         offset + did_len + req_len].decode()}
+        if flags & CorpusWriter.flag_submitter_did:
+            envelope['submitter_did'] = \
+                self.data[offset:offset + did_len].decode()
+        if flags & CorpusWriter.flag_signed:
+            envelope['signed'] = True
+        elif self.new_req_ids:
+            req = json.loads(envelope['request'])
+            req['reqId'] = next(req_ids)
+            envelope['request'] = json.dumps(req)
+
+        return envelope
+
+    def slice(self, start: int, stop: int):
+        """
+        Return the requests in [start, stop) without reading them.
+        The slice must be released (see "CorpusSlice.release") when it
+        is not used anymore.
+        """
+        with self.lock:
+            self.slice_count += 1
+        return CorpusSlice(self, start, min(stop, len(self)))
+
+    def slices(self, number_of_slices: int) -> list:
+        """
+        Divide the corpus into slices of equal size
+        (the first slices have one more request if it cannot be equal).
+        """
+        size, extra = divmod(len(self), number_of_slices)
+        lst_slices = list()
+        start = 0
+        for i in range(number_of_slices):
+            stop = start + size + (1 if i < extra else 0)
+            lst_slices.append(self.slice(start, stop))
+            start = stop
+
+        return lst_slices
+
+    def release(self):
+        """
+        Release one slice of the corpus. The corpus is closed when its last
+        slice is released and its files are removed if it is temporary.
+        """
+        with self.lock:
+            self.slice_count -= 1
+            if self.slice_count > 0:
+                return
+
+        self.close()
+        if self.temporary:
+            for path in [self.path, self.path + '.idx']:
+                try:
+                    os.remove(path)
+                except IOError:
+                    pass
+
+    def close(self):
+        if self.data:
+            self.data.close()
+            self.data = None
+
+
+class CorpusSlice:
+    """
+    A range of records of a corpus. Records are read when iterated.
+    """
+    def __init__(self, corpus: Corpus, start: int, stop: int):
+        self.corpus = corpus
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return max(self.stop - self.start, 0)
+
+    def __iter__(self):
+        for index in range(self.start, self.stop):
+            yield self.corpus[index]
+
+    def release(self):
+        self.corpus.release()
+
+
+class CorpusCache:
+    """
+    Directory of built corpora. A corpus is stored with the request info
+    file of its requests under a key made from everything that the built
+    requests depend on, so a corpus is not reused when any of them changes.
+    """
+    format_version = 1
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    @staticmethod
+    def make_key(kind: str, count: int, seed: str, presign: bool,
+                 genesis_file: str, build_options=None) -> str:
+        """
+        Make the key of a corpus.
+
+        :param kind: kind of ADD request.
+        :param count: number of requests.
+        :param seed: seed of the submitter did.
+        :param presign: the requests are signed or not.
+        :param genesis_file: genesis transactions file of the pool.
+        :param build_options: (optional) dictionary of the other options
+                              that change the built requests (payload
+                              profile, DID pool...).
+        :return: key as hex string.
+        :raise ValueError: if the version of SDK cannot be found (a corpus
+                           must not be reused across SDK versions).
+        """
+        sdk_version = get_sdk_version()
+        if not sdk_version:
+            raise ValueError('Cannot find the version of python3-indy')
+
+        genesis_hash = hashlib.sha256()
+        with open(genesis_file, 'rb') as genesis:
+            for chunk in iter(lambda: genesis.read(65536), b''):
+                genesis_hash.update(chunk)
+
+        data = {'format': CorpusCache.format_version, 'kind': kind,
+                'count': count, 'seed': seed, 'presign': bool(presign),
+                'sdk': sdk_version,
+                'genesis': genesis_hash.hexdigest(),
+                'options': build_options or dict()}
+
+        return hashlib.sha256(
+            json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        Find a cached corpus.
+
+        :return: (corpus path, request info path) or None if there is no
+                 complete corpus for key.
+        """
+        corpus_path, info_path = self.get_paths(key)
+        for path in [corpus_path, corpus_path + '.idx', info_path]:
+            if not os.path.exists(path):
+                return None
+
+        return corpus_path, info_path
+
+    def put(self, key: str, corpus_path: str, info_path: str):
+        """
+        Move a built corpus into the cache and copy its request info file.
+
+        :return: (corpus path, request info path) in the cache.
+        """
+        cached_corpus, cached_info = self.get_paths(key)
+        shutil.copyfile(info_path, cached_info + '.tmp')
+        shutil.move(corpus_path + '.idx', cached_corpus + '.idx')
+        shutil.move(corpus_path, cached_corpus)
+        # Request info is the last one to be in place, so a corpus that
+        # was not moved completely is never found by "get".
+        os.replace(cached_info + '.tmp', cached_info)
+
+        return cached_corpus, cached_info
+
+    def get_paths(self, key: str):
+        """
+        Return (corpus path, request info path) of key.
+        """
+        return (os.path.join(self.cache_dir, key + '.corpus'),
+                os.path.join(self.cache_dir, key + '.info'))
+
+
+# Request ids that are given to replayed requests. They start from the
+# current time in microseconds like the request ids of libindy.
+req_ids = itertools.count(int(time.time() * 1000000))
+
+
+def get_sdk_version():
+    """
+    Return the version of installed python wrapper of libindy or None if
+    it cannot be found.
+    """
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution('python3-indy').version
+    except Exception:
+        return None
@@ -0,0 +1,249 @@
+"""
+Created on Apr 16, 2018
+
+@author: nhan.nguyen
+
+This module contains class "RequestInfoStore" that keeps the information of
+written requests in an indexed SQLite database so that "GET" tests can
+sample their targets without reading all request info files.
+"""
+
+import json
+import random
+import sqlite3
+import time
+
+
+class RequestInfoStore:
+    # Columns that are extracted from the request info of each kind.
+    target_did_keys = {'nym': 'target_did', 'attribute': 'target_did',
+                       'schema': 'dest', 'claim': 'issuer_did'}
+
+    def __init__(self, path: str, timeout=60):
+        """
+        Open (or create) the store.
+
+        :param path: path of the SQLite database file.
+        :param timeout: seconds that a writer waits for the other writers
+                        of the store (clients that add their request info
+                        at the same time).
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS request_info (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                kind_rank INTEGER,
+                target_did TEXT,
+                name TEXT,
+                version TEXT,
+                seq_no INTEGER,
+                written_at REAL NOT NULL,
+                info TEXT NOT NULL);
+        ''')
+        self.add_rank_column()
+        self.connection.executescript('''
+            CREATE INDEX IF NOT EXISTS request_info_kind_id
+                ON request_info (kind, id);
+            CREATE INDEX IF NOT EXISTS request_info_kind_rank
+                ON request_info (kind, kind_rank);
+            CREATE INDEX IF NOT EXISTS request_info_kind_written_at
+                ON request_info (kind, written_at);
+            CREATE INDEX IF NOT EXISTS request_info_kind_target_did
+                ON request_info (kind, target_did);
+            CREATE INDEX IF NOT EXISTS request_info_kind_name_version
+                ON request_info (kind, name, version);
+            CREATE INDEX IF NOT EXISTS request_info_kind_seq_no
+                ON request_info (kind, seq_no);
+        ''')
+
+    def add_rank_column(self):
+        """
+        Add and fill "kind_rank" column in a store that was created
+        without it.
+        """
+        columns = [row[1] for row in self.connection.execute(
+            'PRAGMA table_info(request_info)')]
+        if 'kind_rank' in columns:
+            return
+
+        with self.connection:
+            self.connection.execute(
+                'ALTER TABLE request_info ADD COLUMN kind_rank INTEGER')
+            kinds = [row[0] for row in self.connection.execute(
+                'SELECT DISTINCT kind FROM request_info')]
+            for kind in kinds:
+                ids = [row[0] for row in self.connection.execute(
+                    'SELECT id FROM request_info WHERE kind = ? ORDER BY id',
+                    (kind,))]
+                self.connection.executemany(
+                    'UPDATE request_info SET kind_rank = ? WHERE id = ?',
+                    enumerate(ids))
+
+    def add_many(self, lst_info, written_at=None) -> int:
+        """
+        Add request info. Each request info is numbered by its rank among
+        the request info of its kind ("kind_rank", from 0) so that random
+        samples can be found by an index seek.
+
+        :param lst_info: iterable of request info (dictionary or JSON
+                         string as written by request_builder.RequestBuilder).
+        :param written_at: (optional) time that the requests were written.
+                           The current time is used if it is not passed.
+                           All request info that are added at once share
+                           it, so it is the time of the run that wrote
+                           them rather than the response time of each
+                           request.
+        :return: number of added request info.
+        """
+        written_at = written_at or time.time()
+        next_ranks = dict()
+
+        def rank_rows():
+            for info in lst_info:
+                row = RequestInfoStore.make_row(info, written_at)
+                if not row:
+                    continue
+                kind = row[0]
+                if kind not in next_ranks:
+                    next_ranks[kind] = self.get_next_rank(kind)
+                yield row + (next_ranks[kind],)
+                next_ranks[kind] += 1
+
+        with self.connection:
+            # Take the write lock before the ranks are read so that other
+            # writers cannot take the same ranks.
+            self.connection.execute('BEGIN IMMEDIATE')
+            cursor = self.connection.executemany(
+                'INSERT INTO request_info (kind, target_did, name, version, '
+                'seq_no, written_at, info, kind_rank) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rank_rows())
+
+        return cursor.rowcount
+
+    def get_next_rank(self, kind: str) -> int:
+        """
+        Return the rank of the next request info of kind.
+        """
+        last_rank = self.connection.execute(
+            'SELECT MAX(kind_rank) FROM request_info WHERE kind = ?',
+            (kind,)).fetchone()[0]
+        return 0 if last_rank is None else last_rank + 1
+
+    def add_from_file(self, info_file_path: str, written_at=None) -> int:
+        """
+        Add all request info of a request info file.
+
+        :return: number of added request info.
+        """
+        with open(info_file_path, 'r') as info_file:
+            return self.add_many((line for line in info_file if line.strip()),
+                                 written_at)
+
+    def count(self, kind: str) -> int:
+        """
+        Return the number of request info of kind.
+        """
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM request_info WHERE kind = ?',
+            (kind,)).fetchone()[0]
+
+    def iter_all(self, kind: str):
+        """
+        Return a generator of all request info of kind in written order.
+        """
+        return self.select(
+            'SELECT info FROM request_info WHERE kind = ? ORDER BY id',
+            (kind,))
+
+    def sample_random(self, kind: str, number: int):
+        """
+        Return a generator of "number" random request info of kind.
+        Each sample is found through the (kind, kind_rank) index by a
+        random rank, so every request info of kind is equally likely
+        whatever the other kinds are and sampling does not depend on the
+        size of the store. A request info can be returned more than once.
+        """
+        count = self.get_next_rank(kind)
+        if not count:
+            return
+
+        for _ in range(number):
+            row = self.connection.execute(
+                'SELECT info FROM request_info WHERE kind = ? '
+                'AND kind_rank = ?',
+                (kind, random.randrange(count))).fetchone()
+            yield json.loads(row[0])
+
+    def sample_range(self, kind: str, since=None, until=None, number=None):
+        """
+        Return a generator of request info of kind that were written
+        in [since, until).
+
+        :param since: (optional) start time (seconds since epoch).
+        :param until: (optional) end time (seconds since epoch).
+        :param number: (optional) maximum number of request info.
+        """
+        return self.select(
+            'SELECT info FROM request_info WHERE kind = ? AND written_at >= ?'
+            ' AND written_at < ? ORDER BY written_at LIMIT ?',
+            (kind, since or 0, until or float('inf'),
+             number if number else -1))
+
+    def sample_recent(self, kind: str, number: int):
+        """
+        Return a generator of the "number" most recently written request
+        info of kind.
+        """
+        return self.select(
+            'SELECT info FROM request_info WHERE kind = ? '
+            'ORDER BY written_at DESC, id DESC LIMIT ?', (kind, number))
+
+    def sample(self, kind: str, mode='all', number=0, since=None,
+               until=None):
+        """
+        Return a generator of request info of kind.
+
+        :param mode: "all", "random", "recent" or "range".
+        :param number: number of request info ("random", "recent") or
+                       maximum number of them ("all", "range").
+                       0 means all request info.
+        :param since: start time of "range".
+        :param until: end time of "range".
+        """
+        if mode == 'random':
+            return self.sample_random(kind, number or self.count(kind))
+        if mode == 'recent':
+            return self.sample_recent(kind, number or self.count(kind))
+        return self.sample_range(kind, since, until, number)
+
+    def select(self, query: str, params: tuple):
+        """
+        Run query and return a generator of the parsed request info.
+        Rows are fetched while the generator is iterated.
+        """
+        for row in self.connection.execute(query, params):
+            yield json.loads(row[0])
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def make_row(info, written_at) -> tuple:
+        """
+        Make a row of the store from request info.
+
+        :return: row or None if info cannot be parsed.
+        """
+        try:
+            if isinstance(info, str):
+                info = json.loads(info)
+            kind = info['kind']
+            data = info['data']
+        except (ValueError, KeyError, TypeError):
+            return None
+
+        return (kind, data.get(RequestInfoStore.target_did_keys.get(kind)),
+                data.get('name'), data.get('version'), data.get('seq_no'),
+                written_at, json.dumps(info))
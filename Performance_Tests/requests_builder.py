@@ -11,22 +11,55 @@ import utils
 import json
 import os
 import time
+import asyncio
+import hashlib
+import itertools
+import collections
+import request_corpus
 
 from indy import ledger, signus
 
 
 class RequestBuilder:
-    def __init__(self, req_info_file_path=None, log=False):
+    # Size of payloads of ADD requests: number of schema attributes (and of
+    # "r" keys of claim), bits of each claim key and extra characters of
+    # attribute value.
+    payload_profiles = {
+        'default': {'attr_count': 1, 'key_bits': 64, 'attrib_size': 0},
+        'small': {'attr_count': 5, 'key_bits': 1024, 'attrib_size': 64},
+        'medium': {'attr_count': 20, 'key_bits': 2048, 'attrib_size': 1024},
+        'large': {'attr_count': 100, 'key_bits': 2048, 'attrib_size': 8192},
+        'xlarge': {'attr_count': 250, 'key_bits': 3072,
+                   'attrib_size': 32768}
+    }
+
+    def __init__(self, req_info_file_path=None, log=False, concurrency=1,
+                 corpus_format='text'):
+        """
+        :param req_info_file_path: file that information of built ADD
+                                   requests are written to.
+        :param log: print all log or not.
+        :param concurrency: number of ADD requests that are built at once.
+        :param corpus_format: format of persisted requests. "text" writes
+                              one JSON request per line in each temporary
+                              file, "binary" writes one indexed binary
+                              corpus (see request_corpus).
+        """
         self.log = log
         self.req_info_file_path = req_info_file_path
+        self.concurrency = concurrency if concurrency > 0 else 1
+        self.corpus_format = corpus_format
         self.path = os.path.join(os.path.dirname(__file__), 'temp')
         utils.create_folder(self.path)
         pass
 
     async def build_several_adding_req_to_files(self, args: dict, req_kind,
-                                                number_of_file, number_of_req):
+                                                number_of_file, number_of_req,
+                                                presign=False, persist=True):
         """
         Build several ADD request and write them to list of temporary files.
+        If "persist" is False, the requests are kept in lists in memory
+        instead of temporary files.
         :param args: contain all necessary arguments to build a request
                     (pool_handle, wallet_handle, submitter_did)
         :param req_kind: kind of ADD request (schema, nym, attribute, claim).
@@ -34,7 +67,12 @@ class RequestBuilder:
                                requests. Number of request will be divided
                                equally among temp files.
         :param number_of_req: total of requests you want to build.
-        :return: list of temporary file name.
+        :param presign: sign the requests while building them so that
+                        the sender only submits them.
+        :param persist: write the requests to temporary files or not.
+        :return: list of temporary file name, list of lists of requests or
+                 list of slices of binary corpus (all are accepted by
+                 requests_sender.RequestsSender).
         """
         utils.print_header("\n\tBuilding several {} requests..."
                            .format(req_kind))
@@ -42,77 +80,235 @@ class RequestBuilder:
             utils.start_capture_console()
         works = RequestBuilder.divide(number_of_file, number_of_req)
 
-        req_builder = RequestBuilder.get_adding_req_builder(req_kind)
+        if persist and self.corpus_format == 'binary':
+            files = await self.build_adding_req_to_corpus(
+                args, req_kind, number_of_file, number_of_req, presign)
+        else:
+            files = await self.build_adding_req_to_lists(
+                args, req_kind, works, presign, persist)
+
+        if not self.log:
+            utils.stop_capture_console()
+
+        utils.print_header("\n\tBuilding request complete")
 
+        return files
+
+    async def build_adding_req_to_lists(self, args: dict, req_kind,
+                                        works: list, presign, persist):
+        """
+        Build ADD requests into temporary files or lists in memory.
+
+        :param works: number of requests of each file (or list).
+        :return: list of temporary file name or list of lists of requests.
+        """
         files = list()
+        lst_opened_files = list()
         print(self.req_info_file_path)
         req_info_file = open(self.req_info_file_path, "w")
         for work in works:
+            utils.print_ok_green(str(work))
+            if not persist:
+                files.append(list())
+                lst_opened_files.append(files[-1])
+                continue
             file_name = utils.generate_random_string(
                 suffix='_{}.txt'.format(str(time.time())))
             file_name = os.path.join(self.path, file_name)
-            temp_file = open(file_name, "w")
-            utils.print_ok_green(str(work))
-            for i in range(work):
-                req = await req_builder(args)
-                print(req[1], file=req_info_file)
-                print(req[0], file=temp_file)
-            temp_file.close()
+            lst_opened_files.append(open(file_name, "w"))
             files.append(file_name)
-        req_info_file.close()
 
-        if not self.log:
-            utils.stop_capture_console()
+        # Each slot takes the file of its next request from this shared
+        # iterator, so every file still gets its share of requests.
+        targets = (temp_file
+                   for temp_file, work in zip(lst_opened_files, works)
+                   for _ in range(work))
+
+        async def write(temp_file, req):
+            # Request and its info are written together without
+            # awaiting in between so both files stay consistent.
+            print(req[1], file=req_info_file)
+            if persist:
+                print(json.dumps(req[0]), file=temp_file)
+            else:
+                temp_file.append(req[0])
 
-        utils.print_header("\n\tBuilding request complete")
+        try:
+            await self.build_adding_reqs_in_slots(args, req_kind, targets,
+                                                  write, presign)
+        finally:
+            if persist:
+                for temp_file in lst_opened_files:
+                    temp_file.close()
+            req_info_file.close()
 
         return files
 
+    async def build_adding_req_to_corpus(self, args: dict, req_kind,
+                                         number_of_file, number_of_req,
+                                         presign):
+        """
+        Build ADD requests into one binary corpus.
+
+        :return: list of "number_of_file" slices of the corpus.
+        """
+        corpus_path = os.path.join(self.path, utils.generate_random_string(
+            suffix='_{}.corpus'.format(str(time.time()))))
+        req_info_file = open(self.req_info_file_path, "w")
+
+        async def write(_, req):
+            print(req[1], file=req_info_file)
+            writer.append(req[0])
+
+        with request_corpus.CorpusWriter(corpus_path) as writer:
+            try:
+                await self.build_adding_reqs_in_slots(
+                    args, req_kind, range(number_of_req), write, presign)
+            finally:
+                req_info_file.close()
+
+        utils.print_ok_blue('Requests are written to ' + corpus_path)
+        return request_corpus.Corpus(corpus_path, True).slices(
+            number_of_file)
+
+    async def build_several_adding_req_to_queue(self, args: dict, req_kind,
+                                                number_of_req,
+                                                queue: asyncio.Queue,
+                                                presign=False):
+        """
+        Build several ADD request and put each of them into queue as soon
+        as it is built. Building waits while the queue is full, so
+        requests are built only as fast as they are sent.
+        Request info are written to the request info file. A None is put
+        into queue when all requests are built.
+
+        :param args: contain all necessary arguments to build a request
+                    (pool_handle, wallet_handle, submitter_did)
+        :param req_kind: kind of ADD request (schema, nym, attribute, claim).
+        :param number_of_req: total of requests you want to build.
+        :param queue: queue that built requests are put into.
+        :param presign: sign the requests while building them so that
+                        the sender only submits them.
+        """
+        req_info_file = open(self.req_info_file_path, "w")
+
+        async def put(_, req):
+            print(req[1], file=req_info_file)
+            await queue.put(req[0])
+
+        try:
+            await self.build_adding_reqs_in_slots(
+                args, req_kind, range(number_of_req), put, presign)
+        finally:
+            req_info_file.close()
+            await queue.put(None)
+
+    async def build_adding_reqs_in_slots(self, args: dict, req_kind, targets,
+                                         output, presign=False):
+        """
+        Build one ADD request for each item of targets while keeping up to
+        "concurrency" builds running at once.
+
+        :param args: contain all necessary arguments to build a request.
+        :param req_kind: kind of ADD request (schema, nym, attribute, claim).
+        :param targets: iterable shared by all the slots so each item is
+                        built only once.
+        :param output: coroutine function that takes (target, built
+                       request) and stores the request.
+        :param presign: sign the requests while building them.
+        """
+        req_builder = RequestBuilder.get_adding_req_builder(req_kind)
+        targets = iter(targets)
+        skipped = [0]
+
+        async def build_in_slot():
+            for target in targets:
+                req = await req_builder(args)
+                if presign:
+                    req = await RequestBuilder.sign_built_request(args, req)
+                if not req:
+                    skipped[0] += 1
+                    continue
+                await output(target, req)
+
+        await asyncio.gather(*[build_in_slot()
+                               for _ in range(self.concurrency)])
+
+        if skipped[0]:
+            utils.force_print_warning_to_console(
+                'Skipped {} request(s) that cannot be built\n'.format(
+                    skipped[0]))
+
     async def build_several_getting_req_to_files(self, args, req_kind,
                                                  number_of_file,
-                                                 data_files: list):
+                                                 requests_info,
+                                                 persist=True):
         """
-        Build several ADD request and write them to list of temporary files.
+        Build several GET request and write them to list of temporary files.
+        If "persist" is False, the requests are kept in lists in memory
+        instead of temporary files.
         :param args: contain all necessary arguments to build a request
                     (pool_handle, wallet_handle, submitter_did)
-        :param req_kind: kind of ADD request (schema, nym, attribute, claim).
+        :param req_kind: kind of GET request (schema, nym, attribute, claim).
         :param number_of_file: number of temporary file you want to store
-                               requests. Number of request will be divided
-                               equally among temp files.
-        :param data_files: list file that store request information.
-        :return:
+                               requests. Requests are distributed among
+                               temp files in turn.
+        :param requests_info: iterable of request info (see
+                              "read_requests_info" and
+                              request_info_store.RequestInfoStore).
+        :param persist: write the requests to temporary files or not.
+        :return: list of temporary file name, list of lists of requests or
+                 list of slices of binary corpus.
         """
         utils.print_header("\n\tBuilding several get {} requests..."
                            .format(req_kind))
         if not self.log:
             utils.start_capture_console()
 
-        req_builder = RequestBuilder.get_getting_req_builder(req_kind)
-
         files = list()
         lst_opened_files = list()
-        file_iter = 0
-
-        for data_file_path in data_files:
-            with open(data_file_path, 'r') as data_file:
-                for line in data_file:
-                    if str(line) == '\n':
-                        continue
-                    req = await req_builder(args, json.dumps(line))
-                    if file_iter >= number_of_file:
-                        file_iter = 0
-                    if file_iter >= len(lst_opened_files):
-                        file_name = utils.generate_random_string(
-                            suffix='_{}.txt'.format(str(time.time())))
-                        temp_file = open(file_name, 'w')
-                        lst_opened_files.append(temp_file)
-                        files.append(file_name)
-
-                    print(req, file=lst_opened_files[file_iter])
-                    file_iter += 1
-
-        for file in lst_opened_files:
-            file.close()
+        writer = None
+        if persist and self.corpus_format == 'binary':
+            writer = request_corpus.CorpusWriter(os.path.join(
+                self.path, utils.generate_random_string(
+                    suffix='_{}.corpus'.format(str(time.time())))))
+        else:
+            for _ in range(max(number_of_file, 1)):
+                if not persist:
+                    files.append(list())
+                    lst_opened_files.append(files[-1])
+                    continue
+                file_name = os.path.join(
+                    self.path, utils.generate_random_string(
+                        suffix='_{}.txt'.format(str(time.time()))))
+                lst_opened_files.append(open(file_name, 'w'))
+                files.append(file_name)
+
+        async def write(index, req):
+            if writer:
+                writer.append({'request': req})
+            elif persist:
+                print(req, file=lst_opened_files[index])
+            else:
+                lst_opened_files[index].append(req)
+
+        # Requests go to the files in turn in the order of request info.
+        targets = zip(itertools.cycle(range(len(lst_opened_files) or 1)),
+                      requests_info)
+        try:
+            await self.build_getting_reqs_in_slots(args, req_kind, targets,
+                                                   write)
+        finally:
+            if writer:
+                writer.close()
+            elif persist:
+                for temp_file in lst_opened_files:
+                    temp_file.close()
+
+        if writer:
+            utils.print_ok_blue('Requests are written to ' + writer.path)
+            files = request_corpus.Corpus(writer.path, True).slices(
+                number_of_file)
 
         if not self.log:
             utils.stop_capture_console()
@@ -121,6 +317,87 @@ class RequestBuilder:
 
         return files
 
+    async def build_several_getting_req_to_queue(self, args, req_kind,
+                                                 requests_info,
+                                                 queue: asyncio.Queue):
+        """
+        Build GET requests from request info and put each of them
+        into queue as soon as it is built. Request info is read lazily and
+        building waits while the queue is full, so sending starts with the
+        first built request and memory does not grow with the number of
+        request info. A None is put into queue when all requests are built.
+
+        :param args: contain all necessary arguments to build a request
+                    (pool_handle, wallet_handle, submitter_did)
+        :param req_kind: kind of GET request (schema, nym, attribute, claim).
+        :param requests_info: iterable of request info that is read
+                              while requests are built.
+        :param queue: queue that built requests are put into.
+        """
+        async def put(_, req):
+            await queue.put(req)
+
+        targets = ((None, info) for info in requests_info)
+        try:
+            await self.build_getting_reqs_in_slots(args, req_kind, targets,
+                                                   put)
+        finally:
+            await queue.put(None)
+
+    async def build_getting_reqs_in_slots(self, args, req_kind, targets,
+                                          output):
+        """
+        Build one GET request for each item of targets while keeping up to
+        "concurrency" builds running at once.
+
+        :param args: contain all necessary arguments to build a request.
+        :param req_kind: kind of GET request (schema, nym, attribute, claim).
+        :param targets: iterable of (target, request info) shared by all
+                        the slots so each request info is built only once.
+        :param output: coroutine function that takes (target, built
+                       request) and stores the request.
+        """
+        req_builder = RequestBuilder.get_getting_req_builder(req_kind)
+        targets = iter(targets)
+        skipped = [0]
+
+        async def build_in_slot():
+            for target, info in targets:
+                req = await req_builder(args, info)
+                if not req:
+                    skipped[0] += 1
+                    continue
+                await output(target, req)
+
+        await asyncio.gather(*[build_in_slot()
+                               for _ in range(self.concurrency)])
+
+        if skipped[0]:
+            utils.force_print_warning_to_console(
+                'Skipped {} request(s) that cannot be built\n'.format(
+                    skipped[0]))
+
+    @staticmethod
+    def read_requests_info(data_files):
+        """
+        Read request info files line by line.
+
+        :param data_files: list file that store request information.
+        :return: generator of request info (dictionary).
+        """
+        for data_file_path in data_files:
+            with open(data_file_path, 'r') as data_file:
+                for line in data_file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        utils.force_print_error_to_console(
+                            'Cannot parse request info "{}". '
+                            'Skip...\n'.format(line))
+
     @staticmethod
     async def build_request(args: dict, kind: str, request_info: str=""):
         """
@@ -131,7 +408,7 @@ class RequestBuilder:
         :param kind: kind of request (get_claim, get_attribute, get_nym,
                      get_schema, schema, nym, attribute, claim).
         :param request_info: to build "GET" request.
-        :return: built request.
+        :return: built request or "" if the request cannot be built.
         """
         if kind.startswith("get_"):
             kind = kind.replace("get_", "")
@@ -140,7 +417,96 @@ class RequestBuilder:
         else:
             builder = RequestBuilder.get_adding_req_builder(kind)
             result = await builder(args)
-            return result[0]
+            return result[0] if result else ''
+
+    @staticmethod
+    async def sign_built_request(args: dict, built_request):
+        """
+        Sign a request returned by an ADD request builder.
+
+        :param args: contains wallet handle and submitter did.
+        :param built_request: (request, request info) returned by builder.
+        :return: (signed request, request info) or "" if the request
+                 cannot be signed.
+        """
+        if not built_request:
+            return built_request
+
+        req_data, req_info = built_request
+        try:
+            submitter_did = req_data.get('submitter_did',
+                                         args['submitter_did'])
+            req_data = dict(req_data)
+            req_data['request'] = await ledger.sign_request(
+                args['wallet_handle'], submitter_did, req_data['request'])
+            req_data['signed'] = True
+
+            return req_data, req_info
+        except Exception as e:
+            utils.force_print_error_to_console(
+                "Cannot sign request. Skip building...")
+            utils.force_print_error_to_console(str(e))
+            return ""
+
+    @staticmethod
+    async def create_did(args: dict):
+        """
+        Take a pre-generated DID from "did_pool" of args or create a new
+        one if there is no pool or the pool is empty.
+
+        :param args: contains wallet handle and optional "did_pool".
+        :return: did, verkey.
+        """
+        did_pool = args.get('did_pool')
+        if did_pool:
+            did = did_pool.take()
+            if did:
+                return did
+
+        return await signus.create_and_store_my_did(args['wallet_handle'],
+                                                    '{}')
+
+    @staticmethod
+    async def create_onboarded_did(args: dict):
+        """
+        Take a DID that is already written to ledger from "did_pool" of
+        args (see DidPool.onboard) or create a new DID and send its NYM.
+
+        :param args: contains pool handle, wallet handle, submitter did
+                     and optional "did_pool".
+        :return: did, verkey.
+        """
+        did_pool = args.get('did_pool')
+        if did_pool and did_pool.onboarded:
+            did = did_pool.take()
+            if did:
+                return did
+
+        utils.print_header("\n======= Create did =======")
+        did, verkey = await RequestBuilder.create_did(args)
+
+        utils.print_header("\n======= Build nym request =======")
+        nym_req = await ledger.build_nym_request(args['submitter_did'], did,
+                                                 verkey, None, None)
+
+        utils.print_header("\n======= Send nym request =======")
+        await ledger.sign_and_submit_request(args['pool_handle'],
+                                             args['wallet_handle'],
+                                             args['submitter_did'], nym_req)
+
+        return did, verkey
+
+    @staticmethod
+    def get_payload_profile(args: dict) -> dict:
+        """
+        Return the payload profile in "payload" of args
+        (name or dictionary) or the default profile.
+        """
+        payload = args.get('payload') or 'default'
+        if isinstance(payload, str):
+            payload = RequestBuilder.payload_profiles[payload]
+
+        return payload
 
     @staticmethod
     def divide(number_of_file, number_of_req):
@@ -213,20 +579,19 @@ class RequestBuilder:
         Build ADD nym request.
 
         :param args: arguments for building ADD nym request.
-        :return: nym request, request info.
+        :return: nym request (as dictionary), request info.
         """
-        wallet_handle = args['wallet_handle']
         submitter_did = args['submitter_did']
         try:
             utils.print_header_for_step('Create did')
-            did, _, = await signus.create_and_store_my_did(wallet_handle, '{}')
+            did, _, = await RequestBuilder.create_did(args)
 
             # Send NYM to ledger
             utils.print_header("\n======== Build NYM request ========")
             nym_req = await ledger.build_nym_request(submitter_did, did, None,
                                                      None, None)
             req_info = json.dumps({'kind': 'nym', 'data': {'target_did': did}})
-            req = json.dumps({'request': nym_req})
+            req = {'request': nym_req}
 
             return req, req_info
 
@@ -242,14 +607,17 @@ class RequestBuilder:
         Build ADD schema request.
 
         :param args: arguments for building ADD schema request.
-        :return: schema request, request info.
+        :return: schema request (as dictionary), request info.
         """
         submitter_did = args['submitter_did']
         try:
+            payload = RequestBuilder.get_payload_profile(args)
             data = {
                 'name': utils.generate_random_string(prefix='test'),
                 'version': '1.0',
-                'attr_names': ['test']
+                'attr_names': ['test'] + [
+                    'attr{}'.format(i)
+                    for i in range(1, payload['attr_count'])]
             }
 
             utils.print_header("\n======= Build schema request =======")
@@ -259,7 +627,7 @@ class RequestBuilder:
             del data['attr_names']
             data['dest'] = submitter_did
             req_info = json.dumps({'kind': 'schema', 'data': data})
-            req = json.dumps({'request': schema_req})
+            req = {'request': schema_req}
 
             return req, req_info
 
@@ -275,26 +643,16 @@ class RequestBuilder:
         Build ADD attribute request.
 
         :param args: arguments to build ADD attribute request.
-        :return: attribute request, request info.
+        :return: attribute request (as dictionary), request info.
         """
-        pool_handle = args['pool_handle']
-        wallet_handle = args['wallet_handle']
-        submitter_did = args['submitter_did']
         try:
-            utils.print_header("\n======= Create did =======")
-            did, verkey = await signus.create_and_store_my_did(wallet_handle,
-                                                               '{}')
-
-            utils.print_header("\n======= Build nym request =======")
-            nym_req = await ledger.build_nym_request(submitter_did, did,
-                                                     verkey,
-                                                     None, None)
-
-            utils.print_header("\n======= Send nym request =======")
-            await ledger.sign_and_submit_request(pool_handle, wallet_handle,
-                                                 submitter_did, nym_req)
+            did, verkey = await RequestBuilder.create_onboarded_did(args)
 
             data = {'endpoint': {'ha': '127.0.0.1:5555'}}
+            payload = RequestBuilder.get_payload_profile(args)
+            if payload['attrib_size'] > 0:
+                data['endpoint']['extra'] = utils.generate_random_string(
+                    size=payload['attrib_size'])
 
             utils.print_header("\n======= Build attribute request =======")
             attr_req = await ledger.build_attrib_request(did, did, None,
@@ -304,7 +662,7 @@ class RequestBuilder:
             req_info = json.dumps({'kind': 'attribute',
                                    'data': {'target_did': did,
                                             'raw_name': 'endpoint'}})
-            req = json.dumps({'request': attr_req, 'submitter_did': did})
+            req = {'request': attr_req, 'submitter_did': did}
 
             return req, req_info
 
@@ -320,38 +678,30 @@ class RequestBuilder:
         Build ADD claim request.
 
         :param args: arguments to build ADD claim request.
-        :return: claim request, request info.
+        :return: claim request (as dictionary), request info.
         """
-        import string
         import random
-        pool_handle = args['pool_handle']
-        wallet_handle = args['wallet_handle']
-        submitter_did = args['submitter_did']
         try:
-            utils.print_header("\n======= Create did =======")
-            did, verkey = await signus.create_and_store_my_did(wallet_handle,
-                                                               '{}')
+            did, verkey = await RequestBuilder.create_onboarded_did(args)
 
-            utils.print_header("\n======= Build nym request =======")
-            nym_req = await ledger.build_nym_request(submitter_did, did,
-                                                     verkey,
-                                                     None, None)
+            payload = RequestBuilder.get_payload_profile(args)
+            key_bits = payload['key_bits']
 
-            utils.print_header("\n======= Send nym request =======")
-            await ledger.sign_and_submit_request(pool_handle, wallet_handle,
-                                                 submitter_did, nym_req)
+            def random_key():
+                return str(random.getrandbits(key_bits))
 
             seq_no = random.randint(1, 1000000)
             signature_type = 'CL'
+            r = {"name": random_key()}
+            for i in range(1, payload['attr_count']):
+                r['attr{}'.format(i)] = random_key()
             data = {"primary": {
-                "n": utils.generate_random_string(characters=string.digits),
-                "s": utils.generate_random_string(characters=string.digits),
-                "rms": utils.generate_random_string(characters=string.digits),
-                "r": {"name": utils.generate_random_string(
-                    characters=string.digits)},
-                "rctxt": utils.generate_random_string(
-                    characters=string.digits),
-                "z": utils.generate_random_string(characters=string.digits)}}
+                "n": random_key(),
+                "s": random_key(),
+                "rms": random_key(),
+                "r": r,
+                "rctxt": random_key(),
+                "z": random_key()}}
 
             utils.print_header("\n======= Build claim request =======")
             claim_req = await ledger.build_claim_def_txn(did, seq_no,
@@ -362,7 +712,7 @@ class RequestBuilder:
                                    'data': {'issuer_did': did,
                                             'seq_no': seq_no,
                                             'signature_type': signature_type}})
-            req = json.dumps({'request': claim_req, 'submitter_did': did})
+            req = {'request': claim_req, 'submitter_did': did}
 
             return req, req_info
 
@@ -506,3 +856,107 @@ class RequestBuilder:
                 "Cannot build get claim request. Skip building...")
             utils.force_print_error_to_console(str(e))
             return ''
+
+
+class DidPool:
+    """
+    DIDs that are created in bulk before building requests so that
+    builders do not create them one by one.
+    """
+    def __init__(self):
+        self.dids = collections.deque()
+        self.onboarded = False
+
+    def __len__(self):
+        return len(self.dids)
+
+    def take(self):
+        """
+        Take one DID.
+
+        :return: (did, verkey) or None if the pool is empty.
+        """
+        try:
+            return self.dids.popleft()
+        except IndexError:
+            return None
+
+    async def generate(self, wallet_handle, number_of_did, concurrency=1,
+                       seed_prefix=None, offset=0):
+        """
+        Create DIDs in wallet and add them to the pool.
+
+        :param wallet_handle: wallet that DIDs are stored in.
+        :param number_of_did: number of DIDs.
+        :param concurrency: number of DIDs that are created at once.
+        :param seed_prefix: (optional) if it is passed, the i-th DID is
+                            created from a seed made from prefix and
+                            "offset" + i, so the DIDs can be re-derived.
+        :param offset: index of the first seed.
+        """
+        utils.print_header("\n\tCreating {} DIDs...".format(number_of_did))
+        indexes = iter(range(offset, offset + number_of_did))
+
+        async def create_in_slot():
+            for index in indexes:
+                did_info = '{}'
+                if seed_prefix is not None:
+                    did_info = json.dumps(
+                        {'seed': DidPool.make_seed(seed_prefix, index)})
+                try:
+                    self.dids.append(await signus.create_and_store_my_did(
+                        wallet_handle, did_info))
+                except Exception as e:
+                    utils.force_print_error_to_console(
+                        "Cannot create did. Skip creating...")
+                    utils.force_print_error_to_console(str(e))
+
+        await asyncio.gather(*[create_in_slot()
+                               for _ in range(max(concurrency, 1))])
+
+    async def onboard(self, args: dict, concurrency=1):
+        """
+        Write the NYM of every DID of the pool to ledger so that builders
+        do not send them one by one. DIDs whose NYM fails are removed.
+
+        :param args: contains pool handle, wallet handle and submitter did.
+        :param concurrency: number of NYM requests that are sent at once.
+        :return: number of sent NYM requests, number of failed ones and
+                 elapsed time in seconds.
+        """
+        utils.print_header("\n\tOnboarding {} DIDs...".format(len(self)))
+        dids = iter(list(self.dids))
+        self.dids.clear()
+        failed = [0]
+
+        async def onboard_in_slot():
+            for did, verkey in dids:
+                try:
+                    nym_req = await ledger.build_nym_request(
+                        args['submitter_did'], did, verkey, None, None)
+                    response = await ledger.sign_and_submit_request(
+                        args['pool_handle'], args['wallet_handle'],
+                        args['submitter_did'], nym_req)
+                    if json.loads(response).get('op') != 'REPLY':
+                        raise Exception(response)
+                    self.dids.append((did, verkey))
+                except Exception as e:
+                    failed[0] += 1
+                    utils.force_print_error_to_console(
+                        "Cannot onboard did {}. Skip...".format(did))
+                    utils.force_print_error_to_console(str(e))
+
+        start_time = time.time()
+        await asyncio.gather(*[onboard_in_slot()
+                               for _ in range(max(concurrency, 1))])
+        self.onboarded = True
+
+        return len(self) + failed[0], failed[0], time.time() - start_time
+
+    @staticmethod
+    def make_seed(seed_prefix: str, index: int) -> str:
+        """
+        Make the 32 characters seed of the DID at index.
+        """
+        return hashlib.sha256('{}{}'.format(seed_prefix,
+                                            index).encode()).hexdigest()[:32]
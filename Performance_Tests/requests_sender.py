@@ -11,27 +11,123 @@ import json
 import utils
 import threading
 import asyncio
+import functools
 import time
 import os
+import metrics
+import worker_engine
+import read_cache
 
 from indy import ledger
+from indy.error import IndyError, ErrorCode
 
 
 class RequestsSender:
     __log_file = None
-    start_time = finish_time = -1
+    retriable_results = ['timeout', 'nack']
+    unhedged_suffix = '_unhedged'
+    hedge_min_samples = 20
 
-    def __init__(self, log=False):
+    def __init__(self, log=False, inflight=1, engine='thread', loops=1,
+                 timeout=0, retries=0, backoff=0.5, cache_size=0,
+                 cache_ttl=0, hedge_delay=0, hedge_percentile=0):
+        """
+        :param log: print all log or not.
+        :param inflight: number of requests that each thread keeps
+                         outstanding at once.
+        :param engine: "thread" or "loop" (see WorkerEngine).
+        :param loops: number of event loops used by "loop" engine.
+        :param timeout: deadline of a request in seconds (0 means no
+                        deadline).
+        :param retries: number of retries of a request that timed out or
+                        was not acknowledged.
+        :param backoff: delay before the first retry in seconds. It is
+                        doubled after each retry.
+        :param cache_size: maximum number of GET responses kept in a
+                           client-side read cache (0 means no cache).
+        :param cache_ttl: seconds that a cached GET response stays valid
+                          (0 means forever).
+        :param hedge_delay: seconds after which a duplicate of a GET
+                            request that has not been answered is sent
+                            (0 means no hedging).
+        :param hedge_percentile: if it is not 0, the delay of hedging is
+                                 this percentile of the observed latency
+                                 of GET requests of the same kind
+                                 ("hedge_delay" is used until enough
+                                 latencies are observed).
+        """
         self.log = log
-        self.passed_req = self.failed_req = 0
-        self.start_time = self.finish_time = -1
+        self.inflight = inflight if inflight > 0 else 1
+        self.engine = engine
+        self.loops = loops
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = read_cache.ReadCache(cache_size, cache_ttl) \
+            if cache_size > 0 else None
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
         self.lock = threading.Lock()
         self.first_txn = -1
         self.last_txn = -1
-        self.fastest_txn = -1
-        self.lowest_txn = -1
+        self.shards = list()
+        self.__local = threading.local()
         pass
 
+    @property
+    def passed_req(self):
+        return sum(shard.passed_req for shard in list(self.shards))
+
+    @property
+    def failed_req(self):
+        return sum(shard.failed_req for shard in list(self.shards))
+
+    @property
+    def start_time(self):
+        return self.snapshot().start_time
+
+    @property
+    def finish_time(self):
+        return self.snapshot().finish_time
+
+    @property
+    def latencies(self):
+        return self.snapshot().latencies
+
+    @property
+    def series(self):
+        return self.snapshot().series
+
+    @property
+    def counters(self):
+        return self.snapshot().counters
+
+    def get_shard(self):
+        """
+        Return the metrics shard of current thread.
+        The lock is only taken the first time a thread sends a request.
+        """
+        shard = getattr(self.__local, 'shard', None)
+        if shard is None:
+            shard = self.__local.shard = metrics.MetricsShard()
+            self.lock.acquire()
+            self.shards.append(shard)
+            self.lock.release()
+
+        return shard
+
+    def snapshot(self):
+        """
+        Merge the metrics shards of all threads.
+
+        :return: merged MetricsShard.
+        """
+        result = metrics.MetricsShard()
+        for shard in list(self.shards):
+            result.merge(shard)
+
+        return result
+
     def print_success_msg(self, kind, response):
         """
         Print success message to console.
@@ -90,31 +186,13 @@ class RequestsSender:
 
     def update_start_and_finish_time(self, new_start_time, new_finish_time):
         """
-        Synchronize within threads to update start and finish time.
-        """
-        self.lock.acquire()
-        if self.start_time < 0 \
-                or self.start_time > new_start_time:
-            self.start_time = new_start_time
-        if self.finish_time < new_finish_time:
-            self.finish_time = new_finish_time
-
-        self.lock.release()
-
-    def update_fastest_and_lowest_txn(self, elapsed_time):
-        """
-        Synchronize within threads to update fastest and lowest transactions.
+        Update start and finish time in the shard of current thread.
         """
-        self.lock.acquire()
-        if self.lowest_txn < 0 or self.lowest_txn < elapsed_time:
-            self.lowest_txn = elapsed_time
-
-        if self.fastest_txn < 0 or self.fastest_txn > elapsed_time:
-            self.fastest_txn = elapsed_time
+        self.get_shard().update_start_and_finish_time(new_start_time,
+                                                      new_finish_time)
 
-        self.lock.release()
-
-    def sign_and_submit_several_reqs_from_files(self, args, files, kind):
+    async def sign_and_submit_several_reqs_from_files(self, args, files,
+                                                      kind):
         """
         Sign and submit several request that stored in files.
 
@@ -123,24 +201,10 @@ class RequestsSender:
         request_builder.RequestBuilder.build_several_adding_req_to_files
         :param kind: kind of request.
         """
-        threads = list()
         utils.print_header('\n\tSigning and submitting {} requests...'
                            .format(kind))
-        if not self.log:
-            utils.start_capture_console()
-
-        for file_name in files:
-            temp_thread = threading.Thread(
-                target=self.sign_and_submit_reqs_in_thread,
-                kwargs={'args': args, 'file': file_name, 'kind': kind})
-            temp_thread.start()
-            threads.append(temp_thread)
-
-        for thread in threads:
-            thread.join()
-
-        utils.stop_capture_console()
-        utils.print_header('\n\tSubmitting requests complete')
+        await self.send_several_reqs_from_files(self.sign_and_submit_req,
+                                                args, files, kind)
 
     def sign_and_submit_reqs_in_thread(self, args, file, kind):
         """
@@ -150,71 +214,51 @@ class RequestsSender:
         :param file: request file (store all request you want to submit).
         :param kind: kind of request.
         """
-        start_time = finish_time = 0
-        with open(file, "r") as req_file:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            for line in req_file:
-                # delay - NAK
-                response_time = \
-                    utils.run_async_method(
-                        loop, self.sign_and_submit_req, args, kind, line)
-                if start_time == 0:
-                    start_time = response_time
-                if response_time > finish_time:
-                    finish_time = response_time
-
-            loop.close()
-        self.update_start_and_finish_time(start_time, finish_time)
-        try:
-            os.remove(file)
-        except IOError:
-            pass
+        self.send_reqs_from_file_in_thread(self.sign_and_submit_req, args,
+                                           file, kind)
 
-    async def sign_and_submit_req(self, args, kind, data):
+    async def sign_and_submit_req(self, args, kind, data,
+                                  intended_time=None):
         """
         Sign and submit one request to ledger.
+        A request that was signed when it was built is only submitted.
 
         :param args: arguments to sign and submit requests.
         :param kind: kind of request.
-        :param data: request info.
+        :param data: request as a dictionary or its JSON string.
+        :param intended_time: (optional) the time that the request should
+                              have been sent. If it is passed, latency is
+                              measured from it instead of the actual send
+                              time.
         """
         wallet_handle = args['wallet_handle']
         pool_handle = args['pool_handle']
         submitter_did = args['submitter_did']
 
-        req_data = json.loads(data)
+        if isinstance(data, dict):
+            req_data = data
+        else:
+            try:
+                req_data = json.loads(data)
+            except ValueError:
+                req_data = {'request': data}
         if 'submitter_did' in req_data:
             submitter_did = req_data['submitter_did']
 
         req = req_data['request']
 
-        elapsed_time = 0
-        response_time = None
+        utils.print_header_for_step('Sending {} request'.format(kind))
+        if req_data.get('signed'):
+            return await self.submit_and_record(
+                kind, req, intended_time,
+                lambda: ledger.submit_request(pool_handle, req))
 
-        try:
-            utils.print_header_for_step('Sending {} request'.format(kind))
-            start_time = time.time()
-            response = await ledger.sign_and_submit_request(pool_handle,
-                                                            wallet_handle,
-                                                            submitter_did, req)
-            response_time = time.time()
-            elapsed_time = response_time - start_time
-            self.update_fastest_and_lowest_txn(elapsed_time)
-            self.passed_req += 1
-            self.print_success_msg(kind, response)
-            status = True
-        except Exception as e:
-            self.print_error_msg(kind, req)
-            utils.force_print_error_to_console(str(e) + "\n")
-            self.failed_req += 1
-            status = False
+        return await self.submit_and_record(
+            kind, req, intended_time,
+            lambda: ledger.sign_and_submit_request(pool_handle, wallet_handle,
+                                                   submitter_did, req))
 
-        RequestsSender.print_log(status, elapsed_time, req)
-
-        return response_time
-
-    def submit_several_reqs_from_files(self, args, files, kind):
+    async def submit_several_reqs_from_files(self, args, files, kind):
         """
         Submit several request that stored in files.
 
@@ -223,25 +267,119 @@ class RequestsSender:
         request_builder.RequestBuilder.build_several_adding_req_to_files
         :param kind: kind of request.
         """
-        threads = list()
         utils.print_header('\n\tSubmitting {} requests...'
                            .format(kind))
+        await self.send_several_reqs_from_files(self.submit_req, args, files,
+                                                kind)
+
+    async def send_several_reqs_from_files(self, send, args, files, kind):
+        """
+        Send several request that stored in files with the selected engine.
+        With "thread" engine, each file is sent by its own thread.
+        With "loop" engine, each file is sent by a coroutine worker.
+
+        :param send: coroutine function that sends one request
+                     ("sign_and_submit_req" or "submit_req").
+        :param args: arguments to send requests.
+        :param files: list of request files.
+        :param kind: kind of request.
+        """
         if not self.log:
             utils.start_capture_console()
 
-        for file_name in files:
-            temp_thread = threading.Thread(
-                target=self.submit_reqs_in_thread,
-                kwargs={'args': args, 'file': file_name, 'kind': kind})
-            temp_thread.start()
-            threads.append(temp_thread)
-
-        for thread in threads:
-            thread.join()
+        if self.engine == 'loop':
+            workers = [functools.partial(self.send_reqs_from_file, send,
+                                         args, file_name, kind)
+                       for file_name in files]
+            await worker_engine.WorkerEngine(self.loops).run(workers)
+        else:
+            threads = list()
+            for file_name in files:
+                temp_thread = threading.Thread(
+                    target=self.send_reqs_from_file_in_thread,
+                    kwargs={'send': send, 'args': args, 'file': file_name,
+                            'kind': kind})
+                temp_thread.start()
+                threads.append(temp_thread)
+
+            for thread in threads:
+                thread.join()
 
         utils.stop_capture_console()
         utils.print_header('\n\tSubmitting requests complete')
 
+    async def sign_and_submit_reqs_from_queue(self, args, queue, kind,
+                                              workers=1):
+        """
+        Sign and submit requests taken from queue until a None is taken.
+        All workers run as coroutines in the current event loop.
+
+        :param args: arguments to sign and submit requests.
+        :param queue: asyncio.Queue that requests are put into by
+        request_builder.RequestBuilder.build_several_adding_req_to_queue
+        :param kind: kind of request.
+        :param workers: number of workers. Each worker keeps up to
+                        "inflight" requests outstanding.
+        """
+        utils.print_header('\n\tSigning and submitting {} requests...'
+                           .format(kind))
+        await self.send_reqs_from_queue(self.sign_and_submit_req, args,
+                                        queue, kind, workers)
+        utils.print_header('\n\tSubmitting requests complete')
+
+    async def submit_reqs_from_queue(self, args, queue, kind, workers=1):
+        """
+        Submit requests taken from queue until a None is taken.
+        All workers run as coroutines in the current event loop.
+
+        :param args: arguments to submit requests.
+        :param queue: asyncio.Queue that requests are put into by
+        request_builder.RequestBuilder.build_several_getting_req_to_queue
+        :param kind: kind of request.
+        :param workers: number of workers. Each worker keeps up to
+                        "inflight" requests outstanding.
+        """
+        utils.print_header('\n\tSubmitting get {} requests...'.format(kind))
+        await self.send_reqs_from_queue(self.submit_req, args, queue, kind,
+                                        workers)
+        utils.print_header('\n\tSubmitting requests complete')
+
+    async def send_reqs_from_queue(self, send, args, queue, kind, workers=1):
+        """
+        Send requests taken from queue until a None is taken.
+
+        :param send: coroutine function that sends one request
+                     ("sign_and_submit_req" or "submit_req").
+        :param args: arguments to send requests.
+        :param queue: asyncio.Queue that requests are put into.
+        :param kind: kind of request.
+        :param workers: number of workers. Each worker keeps up to
+                        "inflight" requests outstanding.
+        """
+        times = [0, 0]
+
+        async def send_in_slot():
+            while True:
+                req = await queue.get()
+                if req is None:
+                    # Leave the end mark for the other slots.
+                    await queue.put(None)
+                    return
+                response_time = await send(args, kind, req)
+                if not response_time:
+                    continue
+                if times[0] == 0 or response_time < times[0]:
+                    times[0] = response_time
+                if response_time > times[1]:
+                    times[1] = response_time
+
+        await asyncio.gather(*[send_in_slot()
+                               for _ in range(workers * self.inflight)])
+        await self.wait_for_pending_hedges()
+
+        if times[0]:
+            self.update_start_and_finish_time(times[0], times[1])
+
     def submit_reqs_in_thread(self, args, file, kind):
         """
         Thread function that submit request from one request file.
@@ -250,64 +388,391 @@ class RequestsSender:
         :param file: request file (store all request you want to submit).
         :param kind: kind of request.
         """
-        start_time = finish_time = 0
-        with open(file, "r") as req_file:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            for line in req_file:
-                response_time = utils.run_async_method(
-                    loop, self.submit_req, args, kind, line)
-                if start_time == 0:
-                    start_time = response_time
-                if response_time > finish_time:
-                    finish_time = response_time
-            loop.close()
-        try:
-            os.remove(file)
-        except IOError:
-            pass
+        self.send_reqs_from_file_in_thread(self.submit_req, args, file, kind)
 
-        self.update_start_and_finish_time(start_time, finish_time)
+    def send_reqs_from_file_in_thread(self, send, args, file, kind):
+        """
+        Thread function that send all requests of one request file
+        within a new event loop.
 
-    async def submit_req(self, args, kind, data):
+        :param send: coroutine function that sends one request
+                     ("sign_and_submit_req" or "submit_req").
+        :param args: arguments to send requests.
+        :param file: request file (store all request you want to submit).
+        :param kind: kind of request.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        utils.run_async_method(loop, self.send_reqs_from_file, send, args,
+                               file, kind)
+        loop.close()
+
+    async def send_reqs_from_file(self, send, args, file, kind):
+        """
+        Send all requests of one request file in the current event loop.
+        The file can also be a list of requests that are kept in memory
+        (see "persist" of request_builder.RequestBuilder) or a slice of
+        a binary corpus (see request_corpus.Corpus).
+
+        :param send: coroutine function that sends one request
+                     ("sign_and_submit_req" or "submit_req").
+        :param args: arguments to send requests.
+        :param file: request file (store all request you want to submit),
+                     list of requests or request_corpus.CorpusSlice.
+        :param kind: kind of request.
+        """
+        if not isinstance(file, str):
+            try:
+                start_time, finish_time = await self.send_reqs_in_window(
+                    send, args, kind, iter(file))
+            finally:
+                if isinstance(file, list):
+                    del file[:]
+                else:
+                    file.release()
+        else:
+            with open(file, "r") as req_file:
+                start_time, finish_time = await self.send_reqs_in_window(
+                    send, args, kind, req_file)
+            try:
+                os.remove(file)
+            except IOError:
+                pass
+
+        if start_time:
+            self.update_start_and_finish_time(start_time, finish_time)
+
+    async def send_reqs_in_window(self, send, args, kind, reqs):
+        """
+        Send requests while keeping up to "inflight" of them
+        outstanding at once.
+
+        :param send: coroutine function that sends one request
+                     ("sign_and_submit_req" or "submit_req").
+        :param args: arguments to send requests.
+        :param kind: kind of request.
+        :param reqs: iterable of requests. It is shared by all the
+                     in-flight slots so each request is sent only once.
+        :return: the earliest and the latest response time.
+        """
+        times = [0, 0]
+
+        async def send_in_slot():
+            for req in reqs:
+                response_time = await send(args, kind, req)
+                if not response_time:
+                    continue
+                if times[0] == 0 or response_time < times[0]:
+                    times[0] = response_time
+                if response_time > times[1]:
+                    times[1] = response_time
+
+        await asyncio.gather(*[send_in_slot()
+                               for _ in range(self.inflight)])
+        await self.wait_for_pending_hedges()
+
+        return times[0], times[1]
+
+    async def submit_req(self, args, kind, data, intended_time=None):
         """
         Submit one request to ledger.
 
         :param args: arguments to submit requests.
         :param kind: kind of request.
-        :param data: request info.
-        :return:
+        :param data: request or dictionary with "request".
+        :param intended_time: (optional) the time that the request should
+                              have been sent. If it is passed, latency is
+                              measured from it instead of the actual send
+                              time.
+        :return: response time.
         """
         pool_handle = args['pool_handle']
 
-        req = data
+        req = data['request'] if isinstance(data, dict) else data
+
+        if self.cache is None:
+            utils.print_header_for_step('Sending get {} request'.format(kind))
+            return await self.submit_and_record(
+                'get_' + kind, req, intended_time,
+                self.make_get_submit(pool_handle, kind, req))
 
-        elapsed_time = 0
+        return await self.submit_req_through_cache(pool_handle, kind, req,
+                                                   intended_time)
 
-        response_time = None
+    async def submit_req_through_cache(self, pool_handle, kind, req,
+                                       intended_time=None):
+        """
+        Answer one GET request from the read cache or submit it to ledger
+        and cache its response if it passed.
+        A cache hit is recorded as a passed request of kind
+        "get_<kind>_cached" so that the latency of ledger is reported
+        separately.
+
+        :param pool_handle: pool handle.
+        :param kind: kind of request.
+        :param req: GET request.
+        :param intended_time: (optional) the time that the request should
+                              have been sent.
+        :return: response time.
+        """
+        shard = self.get_shard()
+        start_time = intended_time if intended_time else time.time()
+        key = read_cache.ReadCache.make_key(req) if req else None
+
+        if key:
+            response, expired = self.cache.get(key)
+            if expired:
+                shard.count('cache_expired')
+            if response is not None:
+                shard.count('cache_hit')
+                shard.record('get_{}_cached'.format(kind), 'passed',
+                             time.time() - start_time)
+                return time.time()
+            shard.count('cache_miss')
+
+        submit_get = self.make_get_submit(pool_handle, kind, req)
+
+        async def submit():
+            response = await submit_get()
+            if key and RequestsSender.classify_response(response) == 'passed':
+                evicted = self.cache.put(key, response)
+                if evicted:
+                    self.get_shard().count('cache_eviction', evicted)
+            return response
+
+        utils.print_header_for_step('Sending get {} request'.format(kind))
+        return await self.submit_and_record('get_' + kind, req,
+                                            intended_time, submit)
+
+    def make_get_submit(self, pool_handle, kind, req):
+        """
+        Return function that returns a new coroutine that submits one GET
+        request (hedged if "hedge_delay" or "hedge_percentile" is given).
+        """
+        if self.hedge_delay > 0 or self.hedge_percentile > 0:
+            return lambda: self.submit_hedged_req(pool_handle, 'get_' + kind,
+                                                  req)
+        return lambda: ledger.submit_request(pool_handle, req)
 
+    async def submit_hedged_req(self, pool_handle, kind, req):
+        """
+        Submit one GET request and, if it is not answered within the delay
+        of hedging, submit a duplicate of it. The first answer that is not
+        an error is returned.
+        The latency that the request would have had without hedging is
+        recorded as kind "<kind>_unhedged" (without counting the request)
+        so that both tail latencies can be compared.
+
+        :param pool_handle: pool handle.
+        :param kind: kind of request (get_nym...).
+        :param req: GET request.
+        :return: response.
+        """
+        shard = self.get_shard()
+        delay = self.get_hedge_delay(shard, kind)
+        start_time = time.time()
+
+        def record_unhedged(future):
+            if future.cancelled():
+                return
+            if future.exception():
+                result = RequestsSender.classify_error(future.exception())
+            else:
+                result = RequestsSender.classify_response(future.result())
+            shard.record(kind + RequestsSender.unhedged_suffix, result,
+                         time.time() - start_time, count_request=False)
+
+        # The submissions are tracked from the start, so the unhedged
+        # latency is recorded even if the request times out (and this
+        # coroutine is cancelled) before they are answered.
+        pending_hedges = self.get_pending_hedges()
+        primary = asyncio.ensure_future(
+            ledger.submit_request(pool_handle, req))
+        primary.add_done_callback(record_unhedged)
+        pending_hedges.add(primary)
+        primary.add_done_callback(pending_hedges.discard)
+        if not delay:
+            return await asyncio.shield(primary)
+        await asyncio.wait([primary], timeout=delay)
+        if primary.done():
+            return primary.result()
+
+        shard.count('hedged_req')
+        hedge = asyncio.ensure_future(ledger.submit_request(
+            pool_handle, RequestsSender.make_hedge_request(req)))
+        pending_hedges.add(hedge)
+        hedge.add_done_callback(pending_hedges.discard)
+
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception():
+                    continue
+                if future is hedge:
+                    shard.count('hedge_won')
+                # The other one is left to finish so its error (if any)
+                # is retrieved.
+                for other in pending:
+                    other.add_done_callback(
+                        lambda f: f.cancelled() or f.exception())
+                return future.result()
+
+        return primary.result()
+
+    def get_hedge_delay(self, shard, kind):
+        """
+        Return the delay of hedging of kind in the current thread.
+        With "hedge_percentile", the percentile of the unhedged latency
+        is computed again after each 100 new latencies.
+        """
+        if self.hedge_percentile <= 0:
+            return self.hedge_delay
+
+        histogram = shard.latencies.get(
+            '{}{}/passed'.format(kind, RequestsSender.unhedged_suffix))
+        if histogram is None or \
+                histogram.count < RequestsSender.hedge_min_samples:
+            return self.hedge_delay
+
+        delays = getattr(self.__local, 'hedge_delays', None)
+        if delays is None:
+            delays = self.__local.hedge_delays = dict()
+        count, delay = delays.get(kind, (0, 0))
+        if not count or histogram.count - count >= 100:
+            delay = histogram.percentile(self.hedge_percentile)
+            delays[kind] = (histogram.count, delay)
+
+        return delay
+
+    def get_pending_hedges(self) -> set:
+        """
+        Return the submissions of the GET requests with hedging of the
+        current thread that have not been answered yet.
+        """
+        pending = getattr(self.__local, 'pending_hedges', None)
+        if pending is None:
+            pending = self.__local.pending_hedges = set()
+        return pending
+
+    async def wait_for_pending_hedges(self):
+        """
+        Wait for the submissions of the GET requests with hedging of the
+        current thread, so their unhedged latency is recorded before the
+        event loop is closed. They are waited for without the deadline of
+        requests ("timeout"), so the slowest ones are recorded too.
+        """
+        pending = self.get_pending_hedges()
+        if pending:
+            await asyncio.wait(list(pending))
+
+    @staticmethod
+    def make_hedge_request(req: str) -> str:
+        """
+        Make the duplicate of a GET request with a new request id.
+        """
         try:
-            utils.print_header_for_step('Sending get {} request'.format(kind))
-            start_time = time.time()
-            response = await ledger.submit_request(pool_handle, req)
-            response_time = time.time()
-            elapsed_time = response_time - start_time
+            data = json.loads(req)
+            req_id = int(time.time() * 1000000)
+            data['reqId'] = req_id if req_id != data.get('reqId') \
+                else req_id + 1
+            return json.dumps(data)
+        except (ValueError, TypeError):
+            return req
+
+    async def submit_and_record(self, kind, req, intended_time, submit):
+        """
+        Submit one request with timeout and retries, then classify and
+        record its result in the shard of current thread.
 
-            self.passed_req += 1
-            self.update_fastest_and_lowest_txn(elapsed_time)
-            self.print_success_msg(kind, response)
-            status = True
-        except Exception as e:
+        :param kind: kind of request.
+        :param req: the request (used for log).
+        :param intended_time: the time that the request should have been
+                              sent or None to measure from the actual
+                              send time.
+        :param submit: function that returns a new coroutine that
+                       submits the request.
+        :return: response time or None if the request failed.
+        """
+        shard = self.get_shard()
+        start_time = intended_time if intended_time else time.time()
+        response_time = None
+        result = detail = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                shard.count('retried_req')
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            if not req:
+                result, detail = 'client_error', 'Request was not built'
+                break
+            try:
+                response = await asyncio.wait_for(submit(),
+                                                  self.timeout or None)
+                result = RequestsSender.classify_response(response)
+                detail = response
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = RequestsSender.classify_error(e)
+                detail = e
+            if result not in RequestsSender.retriable_results:
+                break
+
+        elapsed_time = time.time() - start_time
+        status = result == 'passed'
+        if status:
+            response_time = time.time()
+            self.print_success_msg(kind, detail)
+        else:
             self.print_error_msg(kind, req)
-            utils.force_print_error_to_console(str(e) + "\n")
-            self.failed_req += 1
-            status = False
+            utils.force_print_error_to_console(
+                '{}: {}\n'.format(result, str(detail)))
 
+        shard.record(kind, result, elapsed_time)
         RequestsSender.print_log(status, elapsed_time, req)
 
         return response_time
 
-    async def send_request(self, args, kind, request):
+    @staticmethod
+    def classify_response(response):
+        """
+        Classify the response of ledger.
+
+        :return: "passed" if it is a reply, "nack" if the request was not
+                 acknowledged or "rejected" if the pool rejected it.
+        """
+        try:
+            op = json.loads(response).get('op')
+        except (ValueError, TypeError, AttributeError):
+            return 'passed'
+
+        if op == 'REQNACK':
+            return 'nack'
+        if op == 'REJECT':
+            return 'rejected'
+        return 'passed'
+
+    @staticmethod
+    def classify_error(error):
+        """
+        Classify the error raised when submitting a request.
+
+        :return: "timeout", "rejected" or "client_error".
+        """
+        if isinstance(error, asyncio.TimeoutError):
+            return 'timeout'
+        if isinstance(error, IndyError):
+            if error.error_code == ErrorCode.PoolLedgerTimeout:
+                return 'timeout'
+            if error.error_code in (ErrorCode.LedgerNoConsensusError,
+                                    ErrorCode.LedgerInvalidTransaction,
+                                    ErrorCode.LedgerSecurityError):
+                return 'rejected'
+        return 'client_error'
+
+    async def send_request(self, args, kind, request, intended_time=None):
         """
         Submit request to ledger.
 
@@ -316,10 +781,13 @@ class RequestsSender:
         :param kind: kind of request (get_claim, get_attribute, get_nym,
                      get_schema, schema, nym, attribute, claim).
         :param request: request to send.
+        :param intended_time: (optional) the time that the request should
+                              have been sent (used in open-loop testing).
         :return: response time.
         """
         if kind.startswith("get_"):
             return await self.submit_req(args, kind.replace("get_", ""),
-                                         request)
+                                         request, intended_time)
         else:
-            return await self.sign_and_submit_req(args, kind, request)
+            return await self.sign_and_submit_req(args, kind, request,
+                                                  intended_time)
@@ -10,6 +10,7 @@ import random
 import string
 import os
 import sys
+import queue as queue_module
 import tempfile
 
 
@@ -253,3 +254,36 @@ def print_client_result(passed_req, failed_req, elapsed_time):
     seconds = elapsed_time % 60
     print("\n------ Elapsed time: %dh:%dm:%ds" % (
         hours, minutes, seconds) + " ------")
+
+
+def take_process_results(queue, processes: dict):
+    """
+    Take the result of each process from queue. A process that has
+    exited without putting its result is not waited for.
+
+    :param queue: queue that processes put (key, result) into.
+    :param processes: dictionary of key and process.
+    :return: generator of (key, result) and (key, None) for each
+             process that exited without result.
+    """
+    remaining = dict(processes)
+    exited = set()
+    while remaining:
+        try:
+            key, result = queue.get(timeout=1)
+        except queue_module.Empty:
+            # A process is given up only if it was found exited in the
+            # previous round too, so a result that it put just before
+            # exiting is still taken.
+            for key, process in list(remaining.items()):
+                if process.is_alive():
+                    continue
+                if key in exited:
+                    del remaining[key]
+                    yield key, None
+                else:
+                    exited.add(key)
+            continue
+        if key in remaining:
+            del remaining[key]
+            yield key, result
@@ -0,0 +1,111 @@
+"""
+Created on Mar 12, 2018
+
+@author: nhan.nguyen
+
+This module contains class "WorkerEngine" that runs many logical workers as
+coroutines on a few event loops instead of one thread per worker.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+
+import utils
+
+
+class WorkerEngine:
+    # Event loops that are running workers of an engine. A worker that
+    # runs its own group of workers keeps them on its loop, so workers are
+    # only spread over loops at the top level.
+    worker_loops = set()
+
+    def __init__(self, loops=1):
+        """
+        :param loops: number of event loops the workers are spread over.
+                      Each extra loop runs in its own thread.
+                      If it is less than or equal to zero, one loop per
+                      CPU core will be used.
+        """
+        if loops <= 0:
+            loops = os.cpu_count() or 1
+        self.loops = loops
+
+    async def run(self, workers: list, time_out=None):
+        """
+        Run all workers until they finish or time out.
+
+        :param workers: list of coroutine functions without argument.
+        :param time_out: (optional) the workers that are still running after
+                         this number of seconds will be cancelled.
+        """
+        if not workers:
+            return
+
+        loop = asyncio.get_event_loop()
+        if self.loops == 1 or loop in WorkerEngine.worker_loops:
+            await WorkerEngine.run_workers(workers, time_out)
+            return
+
+        # The threads are awaited through futures that they complete, so
+        # the current loop keeps running its other coroutines.
+        futures = list()
+        for i in range(min(self.loops, len(workers))):
+            future = loop.create_future()
+            thread = threading.Thread(
+                target=WorkerEngine.run_workers_in_thread,
+                kwargs={'workers': workers[i::self.loops],
+                        'time_out': time_out,
+                        'on_finish': functools.partial(
+                            loop.call_soon_threadsafe, future.set_result,
+                            None)})
+            thread.daemon = True
+            thread.start()
+            futures.append(future)
+
+        await asyncio.wait(futures)
+
+    @staticmethod
+    def run_workers_in_thread(workers: list, time_out=None, on_finish=None):
+        """
+        Thread function that runs a group of workers in a new event loop.
+
+        :param on_finish: (optional) function that is called when the
+                          workers finish.
+        """
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            utils.run_async_method(loop, WorkerEngine.run_workers, workers,
+                                   time_out)
+        finally:
+            loop.close()
+            if on_finish:
+                on_finish()
+
+    @staticmethod
+    async def run_workers(workers: list, time_out=None):
+        """
+        Run a group of workers concurrently in the current event loop.
+        """
+        loop = asyncio.get_event_loop()
+        is_outermost = loop not in WorkerEngine.worker_loops
+        WorkerEngine.worker_loops.add(loop)
+        try:
+            tasks = [asyncio.ensure_future(worker()) for worker in workers]
+            done, pending = await asyncio.wait(tasks, timeout=time_out)
+
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+        finally:
+            if is_outermost:
+                WorkerEngine.worker_loops.discard(loop)
+
+        for task in done:
+            if task.exception():
+                utils.force_print_error_to_console(
+                    'Worker stopped with error: {}\n'.format(
+                        str(task.exception())))